@@ -1,5 +1,6 @@
 import os
 from celery import Celery
+from celery.signals import worker_process_init, worker_process_shutdown
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
 app = Celery('app')
@@ -20,4 +21,22 @@ app.conf.task_track_started = True
 
 # Настройки для worker
 app.conf.worker_prefetch_multiplier = 1  # Берём по одной задаче за раз
-app.conf.worker_max_tasks_per_child = 50  # Рестарт worker после 50 задач (защита от утечек памяти)
\ No newline at end of file
+app.conf.worker_max_tasks_per_child = 50  # Рестарт worker после 50 задач (защита от утечек памяти)
+
+# Прогрев процесса (модель, индекс общей базы) может занять больше стандартных 4 секунд
+app.conf.worker_proc_alive_timeout = int(os.getenv('CELERY_WORKER_PROC_ALIVE_TIMEOUT', '300'))
+
+
+@worker_process_init.connect
+def warm_up_worker_process(**kwargs):
+    """Загружает модель и индекс общей базы до приёма первой задачи процессом"""
+    if os.getenv('CELERY_WORKER_WARMUP', 'True') != 'True':
+        return
+    from documents.warmup import warm_up
+    warm_up()
+
+
+@worker_process_shutdown.connect
+def clear_worker_process_status(**kwargs):
+    from documents.warmup import clear_status
+    clear_status()
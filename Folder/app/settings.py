@@ -242,3 +242,53 @@ CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL', 'redis://localhost:6379/0')
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_BACKEND = os.getenv('CELERY_RESULT_BACKEND', CELERY_BROKER_URL)
+
+
+# Поиск похожих документов
+# 'memory' — матрица векторов в памяти процесса, 'pgvector' — HNSW-индекс в PostgreSQL
+VECTOR_SEARCH_BACKEND = os.getenv('VECTOR_SEARCH_BACKEND', 'memory')
+# hnsw.ef_search для поиска в pgvector (не меньше числа кандидатов); при нехватке
+# кандидатов после фильтров запрос повторяется с большим значением
+PGVECTOR_EF_SEARCH = int(os.getenv('PGVECTOR_EF_SEARCH', '100'))
+
+# Сравнение с кандидатами подзадачами Celery: число подзадач (1 — последовательно в текущем процессе)
+COMPARISON_WORKERS = int(os.getenv('COMPARISON_WORKERS', '1'))
+# Очередь подзадач; её обслуживает отдельный воркер (celery -A app worker -Q parallel),
+# иначе задачи проверки ждали бы подзадачи, стоящие в их же очереди
+PARALLEL_TASK_QUEUE = os.getenv('PARALLEL_TASK_QUEUE', 'parallel')
+# Максимальное время ожидания результата одной подзадачи (секунды)
+PARALLEL_TASK_TIMEOUT = int(os.getenv('PARALLEL_TASK_TIMEOUT', '600'))
+
+# Векторизация: число предложений в одном пакете модели
+EMBEDDING_BATCH_SIZE = int(os.getenv('EMBEDDING_BATCH_SIZE', '64'))
+# Бэкенд модели: 'torch' — SentenceTransformer, 'onnx' — ONNX Runtime, 'onnx-int8' — ONNX Runtime с int8-квантизацией
+EMBEDDING_BACKEND = os.getenv('EMBEDDING_BACKEND', 'torch')
+# Число потоков ONNX Runtime на процесс (0 — по умолчанию)
+EMBEDDING_THREADS = int(os.getenv('EMBEDDING_THREADS', '0'))
+# Сервер векторизации (manage.py run_embedding_server), например http://127.0.0.1:8765;
+# пусто — модель загружается в каждый процесс
+EMBEDDING_SERVER_URL = os.getenv('EMBEDDING_SERVER_URL', '')
+EMBEDDING_SERVER_TIMEOUT = int(os.getenv('EMBEDDING_SERVER_TIMEOUT', '300'))
+
+# Извлечение текста из PDF: 'pdfminer' — анализ разметки pdfminer.six, 'pymupdf' — PyMuPDF (быстрее)
+PDF_EXTRACTION_BACKEND = os.getenv('PDF_EXTRACTION_BACKEND', 'pdfminer')
+# Число подзадач Celery разбора страниц PDF (1 — последовательно в текущем процессе)
+PDF_EXTRACTION_WORKERS = int(os.getenv('PDF_EXTRACTION_WORKERS', '1'))
+# При PDF_EXTRACTION_WORKERS > 1 подзадачами разбираются PDF не короче стольких страниц
+PDF_PARALLEL_MIN_PAGES = int(os.getenv('PDF_PARALLEL_MIN_PAGES', '40'))
+
+# Кэш векторов и результатов сравнения: LRU в памяти процесса перед Redis
+# Максимальный объём локального кэша (байты) и время жизни записи в нём (секунды)
+CACHE_LOCAL_MAX_BYTES = int(os.getenv('CACHE_LOCAL_MAX_BYTES', str(64 * 1024 * 1024)))
+CACHE_LOCAL_TTL = int(os.getenv('CACHE_LOCAL_TTL', '300'))
+# Redis для кэша — отдельный экземпляр со своим лимитом памяти и политикой вытеснения
+# (в docker-compose — сервис redis-cache): в общем с брокером Celery экземпляре вытеснение
+# записей кэша при maxmemory затрагивало бы очереди задач и результаты
+CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL', 'redis://localhost:6380/0')
+# Размер пула соединений процесса, ожидание свободного соединения при занятом пуле
+# и интервал проверки простаивающих соединений (секунды)
+CACHE_REDIS_MAX_CONNECTIONS = int(os.getenv('CACHE_REDIS_MAX_CONNECTIONS', '20'))
+CACHE_REDIS_POOL_TIMEOUT = int(os.getenv('CACHE_REDIS_POOL_TIMEOUT', '1'))
+CACHE_REDIS_HEALTH_CHECK_INTERVAL = int(os.getenv('CACHE_REDIS_HEALTH_CHECK_INTERVAL', '30'))
+# Через сколько секунд повторять подключение к недоступному Redis
+REDIS_RETRY_INTERVAL = int(os.getenv('REDIS_RETRY_INTERVAL', '30'))
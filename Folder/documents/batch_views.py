@@ -9,6 +9,7 @@ from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.core.paginator import Paginator
 from django.db import transaction
+from django.db.models import Q
 from django.contrib import messages
 import json
 import logging
@@ -182,8 +183,8 @@ def optimize_database_view(request):
             # Создаем индексы
             from django.db import connection
             with connection.cursor() as cursor:
-                cursor.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS vector_hnsw_idx ON document_vectors USING hnsw (vector vector_cosine_ops);")
-                cursor.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS normalized_vector_gin_idx ON document_vectors USING gin (normalized_vector);")
+                cursor.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS vector_normalized_hnsw_idx ON document_vectors USING hnsw (normalized_vector vector_cosine_ops) WITH (m = 16, ef_construction = 64);")
+                cursor.execute("ANALYZE document_vectors;")
                 cursor.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS similarity_weighted_idx ON document_similarities (weighted_similarity DESC);")
             
             return JsonResponse({
@@ -216,22 +217,32 @@ def similarity_search_view(request):
             # Получаем документ
             document = Document.objects.get(id=document_id)
             
-            # Ищем похожие документы
+            # Ищем похожие документы: пара сохраняется детектором при проверке document1 (источник — document2),
+            # взвешенная схожесть симметрична, поэтому учитываются обе стороны пары
             similarities = DocumentSimilarity.objects.filter(
-                document1=document,
+                Q(document1=document) | Q(document2=document),
                 weighted_similarity__gte=threshold
-            ).order_by('-weighted_similarity')[:limit]
+            ).select_related('document1', 'document2').order_by('-weighted_similarity')
             
             results = []
+            seen_ids = set()
             for similarity in similarities:
+                other = similarity.document2 if similarity.document1_id == document.id else similarity.document1
+                if other.id in seen_ids:
+                    continue
+                seen_ids.add(other.id)
                 results.append({
-                    'document_id': similarity.document2.id,
-                    'document_name': similarity.document2.name,
+                    'document_id': other.id,
+                    'document_name': other.name,
                     'similarity': similarity.weighted_similarity,
                     'cosine_similarity': similarity.cosine_similarity,
+                    'jaccard_similarity': similarity.jaccard_similarity,
                     'is_paraphrasing': similarity.is_paraphrasing,
-                    'confidence': similarity.confidence_score
+                    'confidence': similarity.confidence_score,
+                    'compared_at': similarity.updated_at.isoformat()
                 })
+                if len(results) >= limit:
+                    break
             
             return JsonResponse({
                 'success': True,
@@ -0,0 +1,156 @@
+"""
+Ядро сравнения текстов: каждый текст один раз разбивается на токены и переводится
+в профиль (отпечатки шинглов, частоты символов, индекс слов предложений),
+после чего все метрики пары вычисляются только из профилей.
+"""
+
+import json
+import hashlib
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+from documents.sim_cos import tokenize_text, intersection_size, coef_similarity_hashed
+from documents.fingerprints import fingerprints_from_tokens, char_overlap, CLEAN_SHINGLE_SIZES, RAW_SHINGLE_SIZE
+from documents.sentence_matching import SentenceIndex, split_sentences, index_sentences, match_sentences
+
+# Веса метрик в общей схожести
+SIMILARITY_WEIGHTS = {
+    'shingle_1': 0.3,
+    'shingle_3': 0.4,
+    'shingle_5': 0.2,
+    'word_similarity': 0.1
+}
+
+RAW_SHINGLE_KEY = f'raw_{RAW_SHINGLE_SIZE}'
+
+# Версия алгоритма сравнения: при её изменении сохранённые результаты пар (DocumentSimilarity) пересчитываются
+COMPARISON_VERSION = 1
+
+
+class TextProfile:
+    """
+    Представление текста для сравнения. Строится один раз на документ
+    и переиспользуется для сравнения со всеми кандидатами.
+    """
+
+    __slots__ = ('fingerprints', 'sentences')
+
+    def __init__(self, fingerprints: Dict[str, np.ndarray], sentences: SentenceIndex):
+        self.fingerprints = fingerprints
+        self.sentences = sentences
+
+    @classmethod
+    def from_text(cls, text: str, fingerprints: Optional[Dict[str, np.ndarray]] = None) -> 'TextProfile':
+        """
+        Строит профиль текста. Сохранённые отпечатки (documents.fingerprints)
+        избавляют от повторного шинглирования.
+        """
+        raw_tokens, clean_tokens, clean_text = tokenize_text(text)
+        if fingerprints is None:
+            fingerprints = fingerprints_from_tokens(raw_tokens, clean_tokens, clean_text)
+        return cls(fingerprints, index_sentences(split_sentences(clean_text)))
+
+
+def comparison_version(options: Dict) -> str:
+    """Ключ версии результатов сравнения: версия алгоритма, веса метрик и параметры сравнения"""
+    payload = json.dumps({'version': COMPARISON_VERSION, 'weights': SIMILARITY_WEIGHTS, **options}, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def compare_profiles(profile1: TextProfile, profile2: TextProfile,
+                     shingle_sizes: Iterable[int] = CLEAN_SHINGLE_SIZES,
+                     sentence_match_threshold: float = 0.5,
+                     max_matched_sentences: int = 200) -> Dict:
+    """
+    Вычисляет схожесть двух профилей различными методами.
+    Формат результата совпадает с AdvancedPlagiarismDetector.calculate_text_similarity.
+    """
+    fingerprints1 = profile1.fingerprints
+    fingerprints2 = profile2.fingerprints
+    results = {}
+
+    # 1. Схожесть по шинглам разных размеров
+    for shingle_size in shingle_sizes:
+        shingles1 = fingerprints1[f'clean_{shingle_size}']
+        shingles2 = fingerprints2[f'clean_{shingle_size}']
+
+        if shingles1.size and shingles2.size:
+            results[f'shingle_{shingle_size}'] = float(coef_similarity_hashed(shingles1, shingles2))
+
+    # 2. Схожесть по словам (множество слов — это шинглы размера 1)
+    words1 = fingerprints1['clean_1']
+    words2 = fingerprints2['clean_1']
+
+    if words1.size and words2.size:
+        if 'shingle_1' in results:
+            results['word_similarity'] = results['shingle_1']
+        else:
+            results['word_similarity'] = coef_similarity_hashed(words1, words2)
+
+    # 3. Схожесть по символам
+    results['char_similarity'] = char_overlap(fingerprints1, fingerprints2)
+
+    # 4. Схожесть по предложениям: среднее по лучшим совпадениям каждого предложения
+    if profile1.sentences.count and profile2.sentences.count:
+        best_similarity, best_index = match_sentences(profile1.sentences, profile2.sentences)
+        results['sentence_similarity'] = float(best_similarity.mean())
+
+        # Совпавшие предложения для отчёта: номера предложений в обоих текстах
+        matched = np.flatnonzero(best_similarity >= sentence_match_threshold)
+        if matched.size > max_matched_sentences:
+            matched = np.sort(matched[np.argsort(-best_similarity[matched], kind='stable')[:max_matched_sentences]])
+        results['matched_sentences'] = [
+            {
+                'sentence': int(i),
+                'source_sentence': int(best_index[i]),
+                'similarity': round(float(best_similarity[i]), 4)
+            }
+            for i in matched
+        ]
+
+    # Вычисляем общую схожесть как среднее взвешенное
+    weighted_similarity = 0
+    total_weight = 0
+
+    for method, weight in SIMILARITY_WEIGHTS.items():
+        if method in results:
+            weighted_similarity += results[method] * weight
+            total_weight += weight
+
+    results['overall_similarity'] = weighted_similarity / total_weight if total_weight > 0 else 0
+
+    return results
+
+
+def source_metrics(user_fingerprints: Dict[str, np.ndarray],
+                   source_fingerprints: Dict[str, np.ndarray]) -> Tuple[float, float, float]:
+    """
+    Метрики проверяемого документа относительно одного источника по шинглам исходного текста,
+    вычисленные из одного пересечения.
+    Значения совпадают с sim_cos.originality_from_shingles, similarity_by_source_from_shingles
+    и citations_from_shingles.
+
+    Returns:
+        (оригинальность, процент совпадений, процент цитирований)
+    """
+    user_shingles = user_fingerprints[RAW_SHINGLE_KEY]
+    source_shingles = source_fingerprints[RAW_SHINGLE_KEY]
+
+    intersection = intersection_size(user_shingles, source_shingles)
+    union = user_shingles.size + source_shingles.size - intersection
+    similarity = intersection / union if union > 0 else 0
+
+    originality = 100 - (similarity * 100) - 0.01
+
+    if user_shingles.size == 0 or source_shingles.size == 0:
+        match_percent = 0.0
+    else:
+        match_percent = max(0.0, min(100.0, similarity * 100))
+
+    if user_shingles.size == 0:
+        citation_percent = 0.0
+    else:
+        citation_percent = max(0.0, min(100.0, (intersection / user_shingles.size) * 100))
+
+    return originality, match_percent, citation_percent
@@ -0,0 +1,98 @@
+"""
+Сравнение проверяемого документа с кандидатами.
+
+При COMPARISON_WORKERS > 1 кандидаты делятся на группы, и каждая группа сравнивается
+отдельной подзадачей Celery (documents.task_fanout). Подзадача получает только ID и пути
+к TXT файлам и сама строит профиль проверяемого документа по его тексту и сохранённым
+отпечаткам. Результаты возвращаются в порядке кандидатов, поэтому итог проверки
+не зависит от числа подзадач и порядка их завершения.
+"""
+
+import logging
+from typing import Dict, List, NamedTuple, Optional
+
+from django.conf import settings
+
+from documents.comparison import TextProfile, compare_profiles, source_metrics
+from documents.fingerprints import read_fingerprints, compute_and_save_fingerprints
+from documents.task_fanout import dispatch_group, iter_group_results
+
+logger = logging.getLogger(__name__)
+
+# При меньшем числе кандидатов отправка подзадач дороже самого сравнения
+MIN_PARALLEL_CANDIDATES = 4
+
+
+class CandidateTask(NamedTuple):
+    """Документ для сравнения: всё, что нужно подзадаче, без обращения к базе данных"""
+    document_id: int
+    txt_path: str
+
+
+def get_comparison_workers() -> int:
+    """Число подзадач сравнения согласно COMPARISON_WORKERS (1 — в текущем процессе)"""
+    return max(getattr(settings, 'COMPARISON_WORKERS', 1), 1)
+
+
+def _read_text_and_fingerprints(task: CandidateTask):
+    with open(task.txt_path, 'r', encoding='utf-8') as f:
+        text = f.read()
+
+    fingerprints = read_fingerprints(task.document_id)
+    if fingerprints is None:
+        fingerprints = compute_and_save_fingerprints(task.document_id, text)
+    return text, fingerprints
+
+
+def compare_candidate(profile: TextProfile, task: CandidateTask, options: Dict) -> Optional[Dict]:
+    """
+    Сравнивает профиль проверяемого документа с одним кандидатом.
+    Возвращает None, если текст кандидата не удалось прочитать.
+    """
+    try:
+        text, fingerprints = _read_text_and_fingerprints(task)
+    except OSError:
+        return None
+
+    originality, match_percent, citation_percent = source_metrics(profile.fingerprints, fingerprints)
+
+    return {
+        'detailed_similarity': compare_profiles(profile, TextProfile.from_text(text, fingerprints), **options),
+        'originality': originality,
+        'match_percent': match_percent,
+        'citation_percent': citation_percent
+    }
+
+
+def compare_candidates_chunk(document: CandidateTask, tasks: List[CandidateTask], options: Dict) -> List[Optional[Dict]]:
+    """Сравнение группы кандидатов в подзадаче: профиль проверяемого документа строится заново"""
+    text, fingerprints = _read_text_and_fingerprints(document)
+    profile = TextProfile.from_text(text, fingerprints)
+    return [compare_candidate(profile, task, options) for task in tasks]
+
+
+def compare_candidates(document: CandidateTask, profile: TextProfile, tasks: List[CandidateTask],
+                       options: Dict, workers: Optional[int] = None) -> List[Optional[Dict]]:
+    """
+    Сравнивает профиль документа document со всеми кандидатами; результат i соответствует tasks[i].
+    Если подзадачи отправить не удалось, сравнение выполняется в текущем процессе;
+    ошибки самих подзадач пробрасываются.
+    """
+    if workers is None:
+        workers = get_comparison_workers()
+    workers = min(workers, len(tasks))
+
+    if workers > 1 and len(tasks) >= MIN_PARALLEL_CANDIDATES:
+        from documents.tasks import compare_candidates_subtask
+
+        # Непрерывные группы кандидатов: склеенные по порядку результаты групп идут в порядке tasks
+        size = -(-len(tasks) // workers)
+        chunks = [tasks[start:start + size] for start in range(0, len(tasks), size)]
+        group_result = dispatch_group(
+            compare_candidates_subtask.s(list(document), [list(task) for task in chunk], options)
+            for chunk in chunks
+        )
+        if group_result is not None:
+            return [comparison for chunk in iter_group_results(group_result) for comparison in chunk]
+
+    return [compare_candidate(profile, task, options) for task in tasks]
@@ -0,0 +1,92 @@
+"""
+Дедупликация загрузок по содержимому файла: SHA-256 байтов файла считается при сохранении
+документа, повторная загрузка идентичного файла переиспользует TXT, вектор и отпечатки
+уже обработанного документа вместо извлечения текста и векторизации.
+"""
+
+import os
+import shutil
+import hashlib
+import logging
+from typing import Optional
+
+from django.conf import settings
+
+from documents import fingerprints
+from documents.vector_models import DocumentVector
+
+logger = logging.getLogger(__name__)
+
+# Размер блока чтения файла при хешировании
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def compute_file_hash(file) -> str:
+    """SHA-256 содержимого файла (django File/FieldFile), читается блоками"""
+    digest = hashlib.sha256()
+    for chunk in file.chunks(HASH_CHUNK_SIZE):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def find_processed_duplicate(document):
+    """
+    Обработанный документ с тем же содержимым файла, TXT файл которого существует.
+    Документы общей базы (на защите) предпочтительнее, затем более ранние.
+    """
+    from documents.models import Document
+
+    if not document.content_hash:
+        return None
+
+    candidates = Document.objects.filter(content_hash=document.content_hash, processing_status='completed')\
+                                 .exclude(id=document.id)\
+                                 .exclude(txt_file='')\
+                                 .exclude(txt_file__isnull=True)\
+                                 .order_by('-on_defense', 'time_created')
+
+    for candidate in candidates:
+        if fingerprints.get_document_text_path(candidate) is not None:
+            return candidate
+    return None
+
+
+def _copy_file(source_path: str, target_path: str):
+    """Копирует файл через временный файл, чтобы читатели не увидели недописанную копию"""
+    if os.path.abspath(source_path) == os.path.abspath(target_path):
+        return
+    os.makedirs(os.path.dirname(target_path), exist_ok=True)
+    tmp_path = f'{target_path}.tmp'
+    shutil.copyfile(source_path, tmp_path)
+    os.replace(tmp_path, target_path)
+
+
+def reuse_processed_document(source, document) -> bool:
+    """
+    Копирует в document результаты обработки source: TXT файл, вектор и отпечатки шинглов.
+    TXT копируется, а не передаётся ссылкой: файлы источника могут быть удалены
+    (например, при отправке нового документа на защиту). Возвращает False,
+    если переиспользовать не удалось.
+    """
+    source_txt_path = fingerprints.get_document_text_path(source)
+    if source_txt_path is None:
+        return False
+
+    txt_name = f"txt_files/{document.name}.txt"
+    # Если у источника отпечатков нет, они посчитаются при первой проверке (fingerprints.load_fingerprints)
+    source_path = fingerprints.get_fingerprints_path(source.id)
+    try:
+        _copy_file(source_txt_path, os.path.join(settings.MEDIA_ROOT, txt_name))
+        if os.path.exists(source_path):
+            _copy_file(source_path, fingerprints.get_fingerprints_path(document.id))
+    except OSError as e:
+        logger.warning(f"Не удалось скопировать файлы документа {source.id} в {document.id}: {e}")
+        return False
+
+    document.txt_file = txt_name
+    document.vector = source.vector
+    document.save(update_fields=['txt_file', 'vector'])
+    DocumentVector.store_for_document(document, document.get_vector_array())
+
+    logger.info(f"Документ {document.id} совпадает по содержимому с {source.id}: обработка пропущена")
+    return True
@@ -3,21 +3,19 @@
 """
 
 import os
-import re
 import numpy as np
-from typing import List, Tuple, Dict
-from collections import Counter
+from typing import List, Tuple, Dict, Optional
 from django.conf import settings
 
 from documents.models import Document
-from documents.sim_cos import (
-    calculate_originality_large_texts, 
-    generate_hashed_shingles, 
-    coef_similarity_hashed,
-    calculate_similarity_by_source,
-    detect_citations
-)
-from documents.utils_cache import get_cached_vector, cache_vector, get_cached_similarity, cache_similarity_result
+from documents.vector_models import DocumentSimilarity
+from documents.sim_cos import normalize_text
+from documents.fingerprints import load_fingerprints, get_document_text_path
+from documents.comparison import TextProfile, compare_profiles, comparison_version
+from documents.comparison_pool import CandidateTask, compare_candidates
+from documents.utils_cache import get_cached_vector, cache_vector
+from documents.vector_index import get_vector_index
+from documents.shingle_index import find_overlapping_documents, find_near_duplicates
 from .base_detector import BasePlagiarismDetector
 
 
@@ -30,87 +28,40 @@ class AdvancedPlagiarismDetector(BasePlagiarismDetector):
         self.similarity_threshold = 0.6  # Порог схожести для векторов
         self.originality_threshold = 85.0  # Порог оригинальности
         self.min_text_length = 100  # Минимальная длина текста для анализа
+        self.max_similar_documents = 10  # Максимум кандидатов для детального анализа
+        self.min_shared_shingles = 5  # Минимум общих отобранных шинглов для кандидата из индекса
+        self.minhash_threshold = 0.4  # Порог оценки Жаккара по MinHash для fallback без векторов
+        self.sentence_match_threshold = 0.5  # Порог схожести предложения для отчёта о совпадениях
+        self.max_matched_sentences = 200  # Максимум совпавших предложений в отчёте по одному источнику
         
     def preprocess_text(self, text: str) -> str:
         """Предобработка текста для улучшения точности сравнения"""
-        # Приводим к нижнему регистру
-        text = text.lower()
-        
-        # Удаляем лишние пробелы и переносы строк
-        text = re.sub(r'\s+', ' ', text)
-        
-        return text.strip()
+        # Приводим к нижнему регистру и удаляем лишние пробелы и переносы строк
+        return normalize_text(text)
     
-    def calculate_text_similarity(self, text1: str, text2: str) -> Dict:
-        """Вычисляет схожесть между двумя текстами различными методами"""
-        # Предобрабатываем тексты
-        text1_clean = self.preprocess_text(text1)
-        text2_clean = self.preprocess_text(text2)
-        
-        results = {}
-        
-        # 1. Схожесть по шинглам разных размеров
-        for shingle_size in self.shingle_sizes:
-            shingles1 = generate_hashed_shingles(text1_clean, shingle_size)
-            shingles2 = generate_hashed_shingles(text2_clean, shingle_size)
-            
-            if shingles1 and shingles2:
-                similarity = coef_similarity_hashed(shingles1, shingles2)
-                results[f'shingle_{shingle_size}'] = float(similarity)
-        
-        # 2. Схожесть по словам
-        words1 = set(text1_clean.split())
-        words2 = set(text2_clean.split())
-        
-        if words1 and words2:
-            word_intersection = len(words1 & words2)
-            word_union = len(words1 | words2)
-            results['word_similarity'] = word_intersection / word_union if word_union > 0 else 0
-        
-        # 3. Схожесть по символам
-        char1 = Counter(text1_clean)
-        char2 = Counter(text2_clean)
-        
-        char_intersection = sum((char1 & char2).values())
-        char_union = sum((char1 | char2).values())
-        results['char_similarity'] = char_intersection / char_union if char_union > 0 else 0
-        
-        # 4. Схожесть по предложениям
-        sentences1 = [s.strip() for s in re.split(r'[.!?]+', text1_clean) if s.strip()]
-        sentences2 = [s.strip() for s in re.split(r'[.!?]+', text2_clean) if s.strip()]
-        
-        if sentences1 and sentences2:
-            sentence_similarities = []
-            for sent1 in sentences1:
-                for sent2 in sentences2:
-                    if sent1 and sent2:
-                        sent1_words = set(sent1.split())
-                        sent2_words = set(sent2.split())
-                        if sent1_words and sent2_words:
-                            sim = len(sent1_words & sent2_words) / len(sent1_words | sent2_words)
-                            sentence_similarities.append(sim)
-            
-            results['sentence_similarity'] = np.mean(sentence_similarities) if sentence_similarities else 0
-        
-        # Вычисляем общую схожесть как среднее взвешенное
-        weights = {
-            'shingle_1': 0.3,
-            'shingle_3': 0.4,
-            'shingle_5': 0.2,
-            'word_similarity': 0.1
+    def calculate_text_similarity(self, text1: str, text2: str,
+                                  fingerprints1: Optional[Dict] = None,
+                                  fingerprints2: Optional[Dict] = None) -> Dict:
+        """
+        Вычисляет схожесть между двумя текстами различными методами.
+        Готовые отпечатки (documents.fingerprints) избавляют от повторного шинглирования.
+        """
+        return self.compare_profiles(
+            TextProfile.from_text(text1, fingerprints1),
+            TextProfile.from_text(text2, fingerprints2)
+        )
+    
+    def compare_profiles(self, profile1: TextProfile, profile2: TextProfile) -> Dict:
+        """Вычисляет схожесть по готовым профилям текстов (см. documents.comparison)"""
+        return compare_profiles(profile1, profile2, **self.comparison_options())
+    
+    def comparison_options(self) -> Dict:
+        """Параметры сравнения текстов (передаются и в подзадачи сравнения)"""
+        return {
+            'shingle_sizes': tuple(self.shingle_sizes),
+            'sentence_match_threshold': self.sentence_match_threshold,
+            'max_matched_sentences': self.max_matched_sentences
         }
-        
-        weighted_similarity = 0
-        total_weight = 0
-        
-        for method, weight in weights.items():
-            if method in results:
-                weighted_similarity += results[method] * weight
-                total_weight += weight
-        
-        results['overall_similarity'] = weighted_similarity / total_weight if total_weight > 0 else 0
-        
-        return results
     
     def detect_plagiarism(self, document_id: int) -> Dict:
         """Выявляет плагиат для конкретного документа с детальным анализом"""
@@ -130,28 +81,40 @@ class AdvancedPlagiarismDetector(BasePlagiarismDetector):
                 'message': ''
             }
             
+            # --- ПРОВЕРКА ПО СОДЕРЖИМОМУ ФАЙЛА: идентичный файл (SHA-256) в общей базе → 0% ---
+            if document.content_hash:
+                exact_duplicates = list(
+                    Document.objects.filter(on_defense=True, content_hash=document.content_hash)
+                                    .exclude(id=document.id)
+                                    .only('id', 'name')
+                )
+                if exact_duplicates:
+                    result['originality'] = 0.0
+                    result['similarity'] = 100.0
+                    result['citations'] = 0.0
+                    result['is_plagiarized'] = True
+                    result['plagiarism_risk'] = 'very_high'
+                    result['message'] = 'Найден(ы) документ(ы) с идентичным содержимым файла в общей базе. Оригинальность: 0%.'
+                    result['source_matches'] = [
+                        {
+                            'document_id': d.id,
+                            'document_name': d.name,
+                            'match_percent': 100.0,
+                            'citation_percent': 0.0
+                        }
+                        for d in exact_duplicates
+                    ]
+                    return result
+
             # --- ПРОВЕРКА ПО ИМЕНИ ФАЙЛА: если есть дубликаты по имени в общей базе → 0% ---
-            # Общая база: документы с on_defense=True
+            # Общая база: документы с on_defense=True; имя файла хранится в индексированном поле file_basename
             if document.data:
                 try:
-                    current_file_name = os.path.basename(document.data.name)
-                    # Берём все документы из общей базы (отправленные на защиту), кроме текущего
-                    all_docs_with_files = Document.objects.filter(on_defense=True)\
-                                                           .exclude(id=document.id)\
-                                                           .exclude(data='')\
-                                                           .exclude(data__isnull=True)
+                    current_file_name = document.file_basename or os.path.basename(document.data.name)
+                    same_name_docs = Document.objects.filter(on_defense=True, file_basename=current_file_name)\
+                                                     .exclude(id=document.id)
 
-                    exact_duplicates = []
-                    for d in all_docs_with_files:
-                        try:
-                            if d.data:
-                                other_file_name = os.path.basename(d.data.name)
-                                if other_file_name == current_file_name:
-                                    exact_duplicates.append(d)
-                        except Exception:
-                            continue
-
-                    if exact_duplicates:
+                    if same_name_docs.exists():
                         # Есть документы с таким же именем файла в общей базе → оригинальность 0%
                         result['originality'] = 0.0
                         result['similarity'] = 100.0
@@ -160,11 +123,11 @@ class AdvancedPlagiarismDetector(BasePlagiarismDetector):
                         result['message'] = f'Найден(ы) документ(ы) с таким же именем файла ({current_file_name}) в общей базе. Оригинальность: 0%.'
                         result['source_matches'] = [
                             {
-                                'document_id': d.id,
-                                'document_name': d.name,
+                                'document_id': d['id'],
+                                'document_name': d['name'],
                                 'file_name': current_file_name,
                             }
-                            for d in exact_duplicates
+                            for d in same_name_docs.values('id', 'name')
                         ]
                         return result
                 except Exception as e:
@@ -197,9 +160,20 @@ class AdvancedPlagiarismDetector(BasePlagiarismDetector):
                 result['message'] = f'Текст слишком короткий для анализа ({len(document_text)} символов)'
                 return result
             
+            # Отпечатки и профиль проверяемого документа считаются один раз на всю проверку
+            document_fingerprints = load_fingerprints(document, document_text)
+            document_profile = TextProfile.from_text(document_text, document_fingerprints)
+            
             # Находим похожие документы
             similar_docs = self._find_similar_documents(document)
             
+            # Добавляем документы с точными совпадениями фрагментов (инвертированный индекс шинглов),
+            # даже если документ в целом не похож по вектору
+            similar_docs.extend(self._find_overlapping_documents(
+                document, document_fingerprints,
+                exclude_ids=[doc.id for doc, _ in similar_docs]
+            ))
+            
             # Если векторы недоступны, используем текстовый анализ как fallback
             if not similar_docs and not document.vector:
                 similar_docs = self._find_similar_documents_text_based(document, document_text)
@@ -212,78 +186,84 @@ class AdvancedPlagiarismDetector(BasePlagiarismDetector):
                 result['message'] = 'Документ оригинален - похожих документов не найдено'
                 result['plagiarism_risk'] = 'very_low'
             else:
-                # Детальный анализ с каждым похожим документом
+                # Детальный анализ с каждым похожим документом (параллельно подзадачами Celery).
+                # Сохранённые результаты пар переиспользуются, если содержимое обоих документов не изменилось
+                version = comparison_version(self.comparison_options())
+                try:
+                    stored = DocumentSimilarity.load_comparisons(document, [doc for doc, _ in similar_docs], version)
+                except Exception as e:
+                    print(f"Ошибка при чтении сохранённых результатов сравнения: {e}")
+                    stored = {}
+                
+                candidates = []
+                tasks = []
+                for doc, vector_similarity in similar_docs:
+                    if doc.id in stored:
+                        candidates.append((doc, vector_similarity))
+                        continue
+                    candidate_txt_path = get_document_text_path(doc)
+                    if candidate_txt_path is None:
+                        continue
+                    candidates.append((doc, vector_similarity))
+                    tasks.append(CandidateTask(doc.id, candidate_txt_path))
+                
+                computed = iter(compare_candidates(
+                    CandidateTask(document.id, txt_path), document_profile, tasks, self.comparison_options()
+                ))
+                comparisons = [
+                    stored[doc.id] if doc.id in stored else next(computed)
+                    for doc, _ in candidates
+                ]
+                
+                # Новые результаты пар сохраняются одним запросом
+                try:
+                    DocumentSimilarity.store_comparisons(document, [
+                        (doc, vector_similarity, comparison)
+                        for (doc, vector_similarity), comparison in zip(candidates, comparisons)
+                        if comparison is not None and doc.id not in stored
+                    ], version)
+                except Exception as e:
+                    print(f"Ошибка при сохранении результатов сравнения: {e}")
+                
+                # Результаты сводятся в порядке кандидатов
                 similarities = []
-                similar_texts = []
+                compared_sources = []  # Пары (документ, результат сравнения) успешно прочитанных источников
                 detailed_similarities = []
                 
-                for doc, vector_similarity in similar_docs:
-                    if doc.txt_file:
-                        # Получаем путь с обработкой ошибок
-                        try:
-                            similar_txt_path = doc.txt_file.path
-                        except Exception:
-                            similar_txt_path = os.path.join(settings.MEDIA_ROOT, str(doc.txt_file))
-                        
-                        if os.path.exists(similar_txt_path):
-                            with open(similar_txt_path, 'r', encoding='utf-8') as f:
-                                similar_text = f.read()
-                            
-                            # Детальный анализ схожести
-                            detailed_sim = self.calculate_text_similarity(document_text, similar_text)
-                            
-                            similarities.append(detailed_sim['overall_similarity'])
-                            detailed_similarities.append(detailed_sim)
-                            similar_texts.append(similar_text)
-                            
-                            result['similar_documents'].append({
-                                'id': doc.id,
-                                'name': doc.name,
-                                'vector_similarity': float(vector_similarity),
-                                'text_similarity': detailed_sim['overall_similarity'],
-                                'detailed_similarity': detailed_sim,
-                                'originality': float(doc.result) if doc.result else 0.0
-                            })
+                for (doc, vector_similarity), comparison in zip(candidates, comparisons):
+                    if comparison is None:
+                        continue
+                    
+                    detailed_sim = comparison['detailed_similarity']
+                    
+                    similarities.append(detailed_sim['overall_similarity'])
+                    detailed_similarities.append(detailed_sim)
+                    compared_sources.append((doc, comparison))
+                    
+                    result['similar_documents'].append({
+                        'id': doc.id,
+                        'name': doc.name,
+                        'vector_similarity': float(vector_similarity),
+                        'text_similarity': detailed_sim['overall_similarity'],
+                        'detailed_similarity': detailed_sim,
+                        'originality': float(doc.result) if doc.result else 0.0
+                    })
                 
-                if similar_texts:
-                    # Рассчитываем оригинальность для КАЖДОГО похожего документа отдельно
-                    # и берём МИНИМАЛЬНУЮ (худший случай)
+                if compared_sources:
+                    # Оригинальность считается для КАЖДОГО похожего документа отдельно
+                    # (сравнение с ОДНИМ документом), берётся МИНИМАЛЬНАЯ (худший случай)
                     originality_scores = []
                     source_matches = []  # Список совпадений по источникам
-                    
-                    for idx, (doc, vector_sim) in enumerate(similar_docs):
-                        if idx < len(similar_texts):
-                            similar_text = similar_texts[idx]
-                            
-                            # Рассчитываем оригинальность
-                            originality = calculate_originality_large_texts(
-                                document_text, 
-                                [similar_text],  # Сравниваем с ОДНИМ документом
-                                shingle_size=3
-                            )
-                            originality_scores.append(originality)
-                            
-                            # Рассчитываем процент совпадений с этим источником
-                            match_percent = calculate_similarity_by_source(
-                                document_text,
-                                similar_text,
-                                shingle_size=3
-                            )
-                            
-                            # Рассчитываем процент цитирований
-                            citation_percent = detect_citations(
-                                document_text,
-                                similar_text,
-                                shingle_size=3
-                            )
-                            
-                            # Сохраняем информацию об источнике
-                            source_matches.append({
-                                'document_id': doc.id,
-                                'document_name': doc.name,
-                                'match_percent': round(match_percent, 2),
-                                'citation_percent': round(citation_percent, 2)
-                            })
+                    for doc, comparison in compared_sources:
+                        originality_scores.append(comparison['originality'])
+                        
+                        # Сохраняем информацию об источнике
+                        source_matches.append({
+                            'document_id': doc.id,
+                            'document_name': doc.name,
+                            'match_percent': round(comparison['match_percent'], 2),
+                            'citation_percent': round(comparison['citation_percent'], 2)
+                        })
                     
                     # Берём минимальную оригинальность (максимальную схожесть)
                     result['originality'] = max(0.0, min(100.0, min(originality_scores)))
@@ -360,7 +340,10 @@ class AdvancedPlagiarismDetector(BasePlagiarismDetector):
             }
     
     def _find_similar_documents(self, document: Document) -> List[Tuple[Document, float]]:
-        """Находит похожие документы по косинусному сходству векторов с кэшированием"""
+        """
+        Находит похожие документы по косинусному сходству векторов.
+        Кандидаты выбираются по индексу общей базы (в памяти или pgvector).
+        """
         similar_docs = []
         
         if not document.vector:
@@ -378,50 +361,75 @@ class AdvancedPlagiarismDetector(BasePlagiarismDetector):
             if current_vector is None:
                 return similar_docs
             
-            # Берём только документы из общей базы (отправленные на защиту)
+            # Индекс содержит только документы из общей базы (отправленные на защиту)
             # Документы пользователя также могут быть источниками (сравниваются между собой)
-            all_docs = Document.objects.exclude(id=document.id)\
-                                       .exclude(vector__isnull=True)\
-                                       .filter(on_defense=True)
+            matches = get_vector_index().search(
+                current_vector,
+                k=self.max_similar_documents,
+                threshold=self.similarity_threshold,
+                exclude_ids=[document.id]
+            )
+            
+            docs_by_id = Document.objects.in_bulk([doc_id for doc_id, _ in matches])
+            similar_docs = [
+                (docs_by_id[doc_id], similarity)
+                for doc_id, similarity in matches
+                if doc_id in docs_by_id
+            ]
+            
+        except Exception as e:
+            print(f"Ошибка при поиске похожих документов: {e}")
+        
+        return similar_docs
+    
+    def _find_overlapping_documents(self, document: Document, document_fingerprints: Dict,
+                                    exclude_ids: List[int]) -> List[Tuple[Document, float]]:
+        """
+        Находит документы общей базы с общими фрагментами текста по инвертированному индексу шинглов.
+        Возвращает пары (документ, косинусное сходство векторов или 0.0).
+        """
+        overlapping_docs = []
+        
+        if not document_fingerprints:
+            return overlapping_docs
+        
+        try:
+            matches = find_overlapping_documents(
+                document_fingerprints,
+                min_shared=self.min_shared_shingles,
+                exclude_ids=[document.id, *exclude_ids],
+                limit=self.max_similar_documents
+            )
+            
+            current_vector = document.get_vector_array()
+            docs_by_id = Document.objects.in_bulk([doc_id for doc_id, _ in matches])
             
-            for doc in all_docs:
-                # Проверяем кэш схожести
-                cached_sim = get_cached_similarity(document.id, doc.id)
-                if cached_sim is not None:
-                    if cached_sim > self.similarity_threshold:
-                        similar_docs.append((doc, cached_sim))
+            for doc_id, shared in matches:
+                doc = docs_by_id.get(doc_id)
+                if doc is None or not doc.on_defense:
                     continue
                 
-                # Получаем вектор с кэшированием
-                doc_vector = get_cached_vector(doc.id)
-                if doc_vector is None:
-                    doc_vector = doc.get_vector_array()
-                    if doc_vector is not None:
-                        cache_vector(doc.id, doc_vector)
-                
-                if doc_vector is not None:
+                doc_vector = doc.get_vector_array()
+                if current_vector is not None and doc_vector is not None:
                     similarity = self._cosine_similarity(current_vector, doc_vector)
-                    # Кэшируем результат сравнения
-                    cache_similarity_result(document.id, doc.id, similarity)
-                    
-                    if similarity > self.similarity_threshold:
-                        similar_docs.append((doc, similarity))
-            
-            similar_docs.sort(key=lambda x: x[1], reverse=True)
+                else:
+                    similarity = 0.0
+                overlapping_docs.append((doc, similarity))
             
         except Exception as e:
-            print(f"Ошибка при поиске похожих документов: {e}")
+            print(f"Ошибка при поиске по индексу шинглов: {e}")
         
-        return similar_docs
+        return overlapping_docs
     
-    def _find_similar_documents_text_based(self, document: Document, document_text: str, max_docs: int = 50) -> List[Tuple[Document, float]]:
+    def _find_similar_documents_text_based(self, document: Document, document_text: str) -> List[Tuple[Document, float]]:
         """
-        Находит похожие документы на основе текстового анализа (fallback когда векторы недоступны)
+        Находит похожие документы на основе текстового анализа (fallback когда векторы недоступны).
+        Кандидаты берутся из LSH-индекса MinHash-сигнатур всей общей базы,
+        схожесть — оценка коэффициента Жаккара по сигнатурам.
         
         Args:
             document: Документ для анализа
             document_text: Текст документа
-            max_docs: Максимальное количество документов для проверки (для производительности)
             
         Returns:
             Список кортежей (документ, схожесть)
@@ -429,52 +437,15 @@ class AdvancedPlagiarismDetector(BasePlagiarismDetector):
         similar_docs = []
         
         try:
-            # Предобрабатываем текст документа
-            document_text_clean = self.preprocess_text(document_text)
-            
-            # Получаем ограниченное количество документов из общей базы (отправленные на защиту)
-            # Документы пользователя также могут быть источниками (сравниваются между собой)
-            all_docs = Document.objects.exclude(id=document.id)\
-                                       .filter(on_defense=True)\
-                                       .filter(txt_file__isnull=False)\
-                                       .exclude(txt_file='')[:max_docs]
-            
-            for doc in all_docs:
-                if not doc.txt_file:
-                    continue
-                
-                # Получаем путь к TXT файлу
-                try:
-                    similar_txt_path = doc.txt_file.path
-                except Exception:
-                    similar_txt_path = os.path.join(settings.MEDIA_ROOT, str(doc.txt_file))
-                
-                if not os.path.exists(similar_txt_path):
-                    continue
-                
-                # Читаем текст похожего документа
-                try:
-                    with open(similar_txt_path, 'r', encoding='utf-8') as f:
-                        similar_text = f.read()
-                except Exception:
-                    continue
-                
-                # Проверяем длину текста
-                if len(similar_text) < self.min_text_length:
-                    continue
-                
-                # Вычисляем схожесть на основе текста
-                text_similarity_result = self.calculate_text_similarity(document_text_clean, self.preprocess_text(similar_text))
-                similarity = text_similarity_result.get('overall_similarity', 0.0)
-                
-                # Добавляем документ, если схожесть выше порога
-                if similarity > self.similarity_threshold:
-                    similar_docs.append((doc, similarity))
+            # Отпечатки документа считаются один раз для всех сравнений
+            document_fingerprints = load_fingerprints(document, document_text)
             
-            # Сортируем по убыванию схожести
-            similar_docs.sort(key=lambda x: x[1], reverse=True)
-            # Ограничиваем топ-10 для производительности
-            similar_docs = similar_docs[:10]
+            similar_docs = find_near_duplicates(
+                document_fingerprints,
+                threshold=self.minhash_threshold,
+                exclude_ids=[document.id],
+                limit=self.max_similar_documents
+            )
             
         except Exception as e:
             print(f"Ошибка при текстовом поиске похожих документов: {e}")
@@ -0,0 +1,137 @@
+"""
+Бэкенд векторизации на ONNX Runtime (опционально с динамической int8-квантизацией).
+
+Модель экспортируется из той же SentenceTransformer, что и PyTorch-бэкенд (те же веса,
+токенизатор и максимальная длина), поэтому векторы двух бэкендов сопоставимы.
+Экспорт выполняется один раз и сохраняется в каталоге кеша моделей.
+"""
+
+import os
+import logging
+from typing import List
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+ONNX_MODEL_FILE = 'model.onnx'
+ONNX_INT8_MODEL_FILE = 'model-int8.onnx'
+ONNX_OPSET = 14
+# max_seq_length модели paraphrase-MiniLM-L6-v2: более длинные предложения обрезаются, как в SentenceTransformer
+MAX_SEQ_LENGTH = 128
+
+
+def get_onnx_dir(hf_home: str, model_name: str) -> str:
+    return os.path.join(hf_home, 'onnx', model_name)
+
+
+def export_onnx_model(sentence_model, onnx_dir: str, quantized: bool = False) -> str:
+    """
+    Экспортирует трансформер SentenceTransformer в ONNX (и, при необходимости, квантизует в int8).
+    Файлы записываются атомарно, поэтому параллельный экспорт в нескольких процессах безопасен.
+    Возвращает путь к файлу модели.
+    """
+    import torch
+
+    os.makedirs(onnx_dir, exist_ok=True)
+    model_path = os.path.join(onnx_dir, ONNX_MODEL_FILE)
+
+    if not os.path.exists(model_path):
+        transformer = sentence_model[0]
+        auto_model = transformer.auto_model.eval()
+        sample = transformer.tokenizer(['пример предложения'], return_tensors='pt')
+        input_names = [name for name in ('input_ids', 'attention_mask', 'token_type_ids') if name in sample]
+
+        tmp_path = f'{model_path}.{os.getpid()}.tmp'
+        with torch.no_grad():
+            torch.onnx.export(
+                auto_model,
+                tuple(sample[name] for name in input_names),
+                tmp_path,
+                input_names=input_names,
+                output_names=['last_hidden_state'],
+                dynamic_axes={name: {0: 'batch', 1: 'sequence'} for name in input_names + ['last_hidden_state']},
+                opset_version=ONNX_OPSET
+            )
+        transformer.tokenizer.save_pretrained(onnx_dir)
+        os.replace(tmp_path, model_path)
+        logger.info(f"Модель экспортирована в ONNX: {model_path}")
+
+    if not quantized:
+        return model_path
+
+    int8_path = os.path.join(onnx_dir, ONNX_INT8_MODEL_FILE)
+    if not os.path.exists(int8_path):
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+
+        tmp_path = f'{int8_path}.{os.getpid()}.tmp'
+        quantize_dynamic(model_path, tmp_path, weight_type=QuantType.QInt8)
+        os.replace(tmp_path, int8_path)
+        logger.info(f"Модель квантизована в int8: {int8_path}")
+
+    return int8_path
+
+
+class OnnxSentenceEncoder:
+    """
+    Векторизатор предложений на ONNX Runtime с интерфейсом SentenceTransformer.encode:
+    токенизация пакетами, прогон трансформера, mean pooling по маске внимания
+    (как в модуле Pooling модели paraphrase-MiniLM-L6-v2).
+    """
+
+    def __init__(self, model_path: str, tokenizer_dir: str, max_seq_length: int = MAX_SEQ_LENGTH, threads: int = 0):
+        import onnxruntime
+        from transformers import AutoTokenizer
+
+        options = onnxruntime.SessionOptions()
+        if threads > 0:
+            options.intra_op_num_threads = threads
+
+        self.session = onnxruntime.InferenceSession(model_path, options, providers=['CPUExecutionProvider'])
+        self.input_names = {node.name for node in self.session.get_inputs()}
+        self.tokenizer = AutoTokenizer.from_pretrained(tokenizer_dir)
+        self.max_seq_length = max_seq_length
+
+    def encode(self, sentences, batch_size: int = 64, convert_to_numpy: bool = True,
+               show_progress_bar: bool = False) -> np.ndarray:
+        single = isinstance(sentences, str)
+        if single:
+            sentences = [sentences]
+
+        # Предложения близкой длины попадают в один пакет — меньше паддинга
+        order = np.argsort([-len(sentence) for sentence in sentences], kind='stable')
+        embeddings = [None] * len(sentences)
+
+        for start in range(0, len(sentences), batch_size):
+            batch_idx = order[start:start + batch_size]
+            vectors = self._encode_batch([sentences[i] for i in batch_idx])
+            for i, vector in zip(batch_idx, vectors):
+                embeddings[i] = vector
+
+        result = np.vstack(embeddings) if embeddings else np.empty((0, 0), dtype=np.float32)
+        return result[0] if single else result
+
+    def _encode_batch(self, sentences: List[str]) -> np.ndarray:
+        encoded = self.tokenizer(
+            sentences,
+            padding=True,
+            truncation=True,
+            max_length=self.max_seq_length,
+            return_tensors='np'
+        )
+        inputs = {name: encoded[name].astype(np.int64) for name in self.input_names if name in encoded}
+        token_embeddings = self.session.run(None, inputs)[0]
+
+        mask = encoded['attention_mask'][..., None].astype(np.float32)
+        summed = (token_embeddings * mask).sum(axis=1)
+        counts = np.clip(mask.sum(axis=1), 1e-9, None)
+        return (summed / counts).astype(np.float32)
+
+
+def cosine_parity(reference: np.ndarray, candidate: np.ndarray) -> np.ndarray:
+    """Косинусное сходство соответствующих строк двух матриц векторов"""
+    reference = np.asarray(reference, dtype=np.float64)
+    candidate = np.asarray(candidate, dtype=np.float64)
+    norms = np.linalg.norm(reference, axis=1) * np.linalg.norm(candidate, axis=1)
+    norms[norms == 0] = 1.0
+    return (reference * candidate).sum(axis=1) / norms
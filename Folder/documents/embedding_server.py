@@ -0,0 +1,217 @@
+"""
+Сервер векторизации: один процесс держит модель и обслуживает все воркеры Celery
+и gunicorn по HTTP на localhost (или во внутренней сети Docker).
+
+Запросы от разных клиентов, пришедшие почти одновременно, объединяются в один
+вызов модели (микро-пакетирование), результаты разбираются обратно по запросам.
+
+Протокол:
+    POST /embed   {"sentences": [...]} -> application/octet-stream, float32 little-endian,
+                  форма в заголовках X-Embedding-Rows / X-Embedding-Dim
+    GET  /health  {"status": "ok", ...}
+"""
+
+import json
+import time
+import queue
+import logging
+import threading
+import http.client
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_DTYPE = np.dtype('<f4')
+
+# Сколько ждать попутных запросов после первого (секунды)
+DEFAULT_MAX_WAIT = 0.01
+# Больше предложений в один вызов модели не объединяется (один большой запрос не делится)
+DEFAULT_MAX_BATCH_SENTENCES = 512
+
+
+class _EmbeddingJob:
+    __slots__ = ('sentences', 'done', 'result', 'error')
+
+    def __init__(self, sentences: List[str]):
+        self.sentences = sentences
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class EmbeddingBatcher:
+    """
+    Очередь запросов векторизации с одним потоком, вызывающим модель.
+    """
+
+    def __init__(self, model, batch_size: int = 64, max_wait: float = DEFAULT_MAX_WAIT,
+                 max_batch_sentences: int = DEFAULT_MAX_BATCH_SENTENCES):
+        self.model = model
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.max_batch_sentences = max_batch_sentences
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='embedding-batcher', daemon=True)
+        self._thread.start()
+
+    def submit(self, sentences: List[str]) -> np.ndarray:
+        """Векторизует предложения; блокирует вызывающий поток до готовности результата"""
+        job = _EmbeddingJob(sentences)
+        self._queue.put(job)
+        job.done.wait()
+        if job.error is not None:
+            raise job.error
+        return job.result
+
+    def _collect(self) -> List[_EmbeddingJob]:
+        jobs = [self._queue.get()]
+        total = len(jobs[0].sentences)
+        deadline = time.monotonic() + self.max_wait
+
+        while total < self.max_batch_sentences:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                job = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            jobs.append(job)
+            total += len(job.sentences)
+
+        return jobs
+
+    def _run(self):
+        while True:
+            jobs = self._collect()
+            sentences = [sentence for job in jobs for sentence in job.sentences]
+
+            try:
+                vectors = np.asarray(self.model.encode(
+                    sentences,
+                    batch_size=self.batch_size,
+                    convert_to_numpy=True,
+                    show_progress_bar=False
+                ), dtype=EMBEDDING_DTYPE)
+
+                offset = 0
+                for job in jobs:
+                    job.result = vectors[offset:offset + len(job.sentences)]
+                    offset += len(job.sentences)
+            except Exception as e:
+                logger.error(f"Ошибка векторизации пакета из {len(sentences)} предложений: {e}")
+                for job in jobs:
+                    job.error = e
+            finally:
+                for job in jobs:
+                    job.done.set()
+
+            if len(jobs) > 1:
+                logger.debug(f"Объединено {len(jobs)} запросов ({len(sentences)} предложений) в один вызов модели")
+
+
+class EmbeddingRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        if self.path != '/health':
+            self._send_json(404, {'error': 'not found'})
+            return
+        self._send_json(200, {'status': 'ok', **self.server.info})
+
+    def do_POST(self):
+        if self.path != '/embed':
+            self._send_json(404, {'error': 'not found'})
+            return
+
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            sentences = json.loads(self.rfile.read(length))['sentences']
+            if not isinstance(sentences, list) or not all(isinstance(s, str) for s in sentences):
+                raise ValueError('sentences должен быть списком строк')
+        except (ValueError, KeyError, TypeError) as e:
+            self._send_json(400, {'error': str(e)})
+            return
+
+        try:
+            vectors = self.server.batcher.submit(sentences) if sentences else np.empty((0, 0), dtype=EMBEDDING_DTYPE)
+        except Exception as e:
+            self._send_json(500, {'error': str(e)})
+            return
+
+        body = np.ascontiguousarray(vectors, dtype=EMBEDDING_DTYPE).tobytes()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('X-Embedding-Rows', str(vectors.shape[0]))
+        self.send_header('X-Embedding-Dim', str(vectors.shape[1] if vectors.ndim == 2 else 0))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status: int, payload: dict):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} {format % args}")
+
+
+def create_server(model, host: str, port: int, batch_size: int = 64, max_wait: float = DEFAULT_MAX_WAIT,
+                  info: Optional[dict] = None) -> ThreadingHTTPServer:
+    """Создаёт HTTP-сервер векторизации (запуск — serve_forever())"""
+    server = ThreadingHTTPServer((host, port), EmbeddingRequestHandler)
+    server.daemon_threads = True
+    server.batcher = EmbeddingBatcher(model, batch_size=batch_size, max_wait=max_wait)
+    server.info = info or {}
+    return server
+
+
+def _shape_header(response, name: str) -> int:
+    value = response.headers.get(name)
+    if value is None or not value.isdigit():
+        raise ValueError(f"Некорректный заголовок {name} в ответе сервера векторизации: {value!r}")
+    return int(value)
+
+
+def request_embeddings(server_url: str, sentences: List[str], timeout: float) -> np.ndarray:
+    """
+    Клиент: векторизует предложения на сервере. Ошибки соединения и HTTP
+    (в том числе оборванный ответ, http.client.HTTPException) пробрасываются как OSError,
+    ошибки формата (нет заголовков формы, неверный размер) — как ValueError.
+    """
+    request = urllib.request.Request(
+        f"{server_url.rstrip('/')}/embed",
+        data=json.dumps({'sentences': sentences}, ensure_ascii=False).encode('utf-8'),
+        headers={'Content-Type': 'application/json; charset=utf-8'},
+        method='POST'
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            rows = _shape_header(response, 'X-Embedding-Rows')
+            dim = _shape_header(response, 'X-Embedding-Dim')
+            body = response.read()
+    except http.client.HTTPException as e:
+        raise OSError(f"Ошибка HTTP сервера векторизации: {e!r}") from e
+
+    vectors = np.frombuffer(body, dtype=EMBEDDING_DTYPE)
+    if vectors.size != rows * dim or rows != len(sentences):
+        raise ValueError(f"Некорректный ответ сервера векторизации: {rows}x{dim}, {len(body)} байт")
+    return vectors.reshape(rows, dim)
+
+
+def check_server_health(server_url: str, timeout: float = 2.0) -> Optional[dict]:
+    """Возвращает ответ /health сервера векторизации или None, если сервер недоступен"""
+    try:
+        with urllib.request.urlopen(f"{server_url.rstrip('/')}/health", timeout=timeout) as response:
+            health = json.loads(response.read())
+    except (OSError, ValueError, TypeError, http.client.HTTPException):
+        return None
+    return health if isinstance(health, dict) else None
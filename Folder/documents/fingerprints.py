@@ -0,0 +1,163 @@
+"""
+Отпечатки документов: наборы шинглов, вычисляемые один раз при загрузке
+и сохраняемые рядом с TXT файлом в компактном бинарном виде (.npz)
+"""
+
+import os
+import logging
+from typing import Dict, List, Optional
+
+import numpy as np
+from django.conf import settings
+
+from documents.sim_cos import tokenize_text, tokens_to_ids, shingle_fingerprints
+from documents.minhash import minhash_signature
+
+logger = logging.getLogger(__name__)
+
+# Версия формата; при изменении набора ключей старые файлы пересчитываются
+FINGERPRINT_VERSION = 2
+
+# Размеры шинглов нормализованного текста (используются в calculate_text_similarity)
+CLEAN_SHINGLE_SIZES = (1, 3, 5)
+# Размер шинглов исходного текста (оригинальность, совпадения по источнику, цитирования)
+RAW_SHINGLE_SIZE = 3
+# Набор шинглов, по которому строится MinHash-сигнатура
+MINHASH_SHINGLE_KEY = 'clean_3'
+
+
+def get_fingerprints_dir() -> str:
+    return os.path.join(settings.MEDIA_ROOT, 'fingerprints')
+
+
+def get_fingerprints_path(document_id: int) -> str:
+    return os.path.join(get_fingerprints_dir(), f'{document_id}.npz')
+
+
+def compute_fingerprints(text: str) -> Dict[str, np.ndarray]:
+    """
+    Вычисляет отпечатки текста:
+    clean_N — шинглы размера N нормализованного текста,
+    raw_3 — шинглы исходного текста,
+    chars/char_counts — частоты символов нормализованного текста,
+    minhash — MinHash-сигнатура шинглов MINHASH_SHINGLE_KEY.
+    """
+    return fingerprints_from_tokens(*tokenize_text(text))
+
+
+def fingerprints_from_tokens(raw_tokens: List[str], clean_tokens: List[str], clean_text: str) -> Dict[str, np.ndarray]:
+    """Вычисляет отпечатки по уже разбитому тексту (см. sim_cos.tokenize_text)"""
+    clean_ids = tokens_to_ids(clean_tokens)
+
+    fingerprints = {
+        f'clean_{size}': shingle_fingerprints(clean_ids, size)
+        for size in CLEAN_SHINGLE_SIZES
+    }
+    fingerprints[f'raw_{RAW_SHINGLE_SIZE}'] = shingle_fingerprints(tokens_to_ids(raw_tokens), RAW_SHINGLE_SIZE)
+    fingerprints['minhash'] = minhash_signature(fingerprints[MINHASH_SHINGLE_KEY])
+
+    codepoints = np.frombuffer(clean_text.encode('utf-32-le'), dtype=np.uint32)
+    fingerprints['chars'], fingerprints['char_counts'] = np.unique(codepoints, return_counts=True)
+
+    return fingerprints
+
+
+def save_fingerprints(document_id: int, fingerprints: Dict[str, np.ndarray]):
+    """Атомарно сохраняет отпечатки документа в MEDIA_ROOT/fingerprints/<id>.npz"""
+    path = get_fingerprints_path(document_id)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, version=np.array(FINGERPRINT_VERSION), **fingerprints)
+    os.replace(tmp_path, path)
+
+
+def read_fingerprints(document_id: int) -> Optional[Dict[str, np.ndarray]]:
+    """Читает сохранённые отпечатки; None если файла нет или формат устарел"""
+    path = get_fingerprints_path(document_id)
+    if not os.path.exists(path):
+        return None
+
+    try:
+        with np.load(path) as data:
+            if int(data['version']) != FINGERPRINT_VERSION:
+                return None
+            return {key: data[key] for key in data.files if key != 'version'}
+    except Exception as e:
+        logger.warning(f"Не удалось прочитать отпечатки документа {document_id}: {e}")
+        return None
+
+
+def delete_fingerprints(document_id: int):
+    try:
+        os.remove(get_fingerprints_path(document_id))
+    except FileNotFoundError:
+        pass
+
+
+def get_document_text_path(document) -> Optional[str]:
+    """Путь к TXT файлу документа или None, если файла нет"""
+    if not document.txt_file:
+        return None
+
+    try:
+        txt_path = document.txt_file.path
+    except Exception:
+        txt_path = os.path.join(settings.MEDIA_ROOT, str(document.txt_file))
+
+    if not os.path.exists(txt_path):
+        return None
+    return txt_path
+
+
+def read_document_text(document) -> Optional[str]:
+    """Читает TXT файл документа"""
+    txt_path = get_document_text_path(document)
+    if txt_path is None:
+        return None
+
+    with open(txt_path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def load_fingerprints(document, text: Optional[str] = None) -> Optional[Dict[str, np.ndarray]]:
+    """
+    Возвращает отпечатки документа. Если сохранённых нет (документ загружен
+    до появления отпечатков), вычисляет их из текста и сохраняет.
+    """
+    fingerprints = read_fingerprints(document.id)
+    if fingerprints is not None:
+        return fingerprints
+
+    if text is None:
+        text = read_document_text(document)
+        if text is None:
+            return None
+
+    return compute_and_save_fingerprints(document.id, text)
+
+
+def compute_and_save_fingerprints(document_id: int, text: str) -> Dict[str, np.ndarray]:
+    """Вычисляет отпечатки текста и сохраняет их; ошибка записи не мешает вернуть результат"""
+    fingerprints = compute_fingerprints(text)
+    try:
+        save_fingerprints(document_id, fingerprints)
+    except OSError as e:
+        logger.warning(f"Не удалось сохранить отпечатки документа {document_id}: {e}")
+
+    return fingerprints
+
+
+def char_overlap(fingerprints1: Dict[str, np.ndarray], fingerprints2: Dict[str, np.ndarray]) -> float:
+    """
+    Схожесть по символам: сумма минимумов частот / сумма максимумов частот.
+    """
+    chars1, counts1 = fingerprints1['chars'], fingerprints1['char_counts']
+    chars2, counts2 = fingerprints2['chars'], fingerprints2['char_counts']
+
+    _, idx1, idx2 = np.intersect1d(chars1, chars2, assume_unique=True, return_indices=True)
+    char_intersection = int(np.minimum(counts1[idx1], counts2[idx2]).sum())
+    char_union = int(counts1.sum()) + int(counts2.sum()) - char_intersection
+
+    return char_intersection / char_union if char_union > 0 else 0
@@ -0,0 +1,84 @@
+"""
+Management-команда для проверки совпадения векторов ONNX-бэкенда с PyTorch-бэкендом
+"""
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from documents.models import Document
+from documents import vector
+from documents.embedding_onnx import cosine_parity
+from documents.fingerprints import read_document_text
+
+# Предложения для проверки, если в базе ещё нет документов
+SAMPLE_SENTENCES = [
+    'Система антиплагиата проверяет документы на заимствования.',
+    'В работе рассматриваются методы векторизации текстов на естественном языке.',
+    'Результаты эксперимента показывают высокую точность предложенного алгоритма.',
+    'Глава 1. Обзор предметной области',
+    'The proposed approach reduces the processing time of large documents.',
+]
+
+
+class Command(BaseCommand):
+    help = 'Сравнить векторы ONNX-бэкенда (onnx / onnx-int8) с PyTorch SentenceTransformer по косинусному сходству'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--backend',
+            choices=['onnx', 'onnx-int8'],
+            default='onnx-int8',
+            help='Проверяемый бэкенд',
+        )
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=0.99,
+            help='Минимально допустимое косинусное сходство с PyTorch-вектором',
+        )
+        parser.add_argument(
+            '--documents',
+            type=int,
+            default=5,
+            help='Число документов, предложения которых используются для проверки',
+        )
+        parser.add_argument(
+            '--sentences',
+            type=int,
+            default=500,
+            help='Максимальное число предложений',
+        )
+
+    def handle(self, *args, **options):
+        sentences = list(SAMPLE_SENTENCES)
+        for doc in Document.objects.exclude(txt_file='').exclude(txt_file__isnull=True).order_by('-id')[:options['documents']]:
+            text = read_document_text(doc)
+            if text:
+                sentences.extend(s.strip() for s in vector.split_text_to_sentences(text) if s.strip())
+        sentences = sentences[:options['sentences']]
+        
+        self.stdout.write(f'Предложений для проверки: {len(sentences)}')
+        
+        torch_vectors = vector.load_torch_model().encode(sentences, batch_size=vector.get_embedding_batch_size())
+        try:
+            onnx_model = vector.load_onnx_model(quantized=options['backend'] == 'onnx-int8')
+        except ImportError as e:
+            raise CommandError(f'ONNX Runtime недоступен: {e}')
+        onnx_vectors = onnx_model.encode(sentences, batch_size=vector.get_embedding_batch_size())
+        
+        parity = cosine_parity(torch_vectors, onnx_vectors)
+        # Векторы документов — средние векторов предложений, проверяем и их
+        document_parity = float(cosine_parity(torch_vectors.mean(axis=0, keepdims=True), onnx_vectors.mean(axis=0, keepdims=True))[0])
+        
+        self.stdout.write(
+            f'Косинусное сходство с PyTorch ({options["backend"]}): '
+            f'мин. {parity.min():.5f}, среднее {parity.mean():.5f}, '
+            f'1-й перцентиль {np.percentile(parity, 1):.5f}, среднего вектора {document_parity:.5f}'
+        )
+        
+        if parity.min() < options['tolerance']:
+            worst = int(parity.argmin())
+            raise CommandError(
+                f'Сходство ниже допуска {options["tolerance"]}: {parity[worst]:.5f} для предложения "{sentences[worst][:100]}"'
+            )
+        
+        self.stdout.write(self.style.SUCCESS('Векторы бэкенда совместимы с сохранёнными векторами'))
@@ -0,0 +1,84 @@
+"""
+Management-команда: проверка сопоставления предложений (documents.sentence_matching)
+
+Лучшие совпадения предложений пар документов сравниваются с полным перебором пар
+предложений и должны совпадать с ним (схожесть и номер предложения источника).
+"""
+
+import time
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from documents.models import Document
+from documents.fingerprints import read_document_text
+from documents.sim_cos import tokenize_text
+from documents.sentence_matching import split_sentences, index_sentences, match_sentences
+
+
+def brute_force_matches(sentences1, sentences2):
+    """Эталон: коэффициент Жаккара множеств слов для всех пар, при равенстве — более раннее предложение источника"""
+    words2 = [set(sentence.split()) for sentence in sentences2]
+    best_similarity = np.zeros(len(sentences1), dtype=np.float64)
+    best_index = np.full(len(sentences1), -1, dtype=np.int64)
+    for i, sentence in enumerate(sentences1):
+        words1 = set(sentence.split())
+        for j, words in enumerate(words2):
+            shared = len(words1 & words)
+            if shared and shared / (len(words1) + len(words) - shared) > best_similarity[i]:
+                best_similarity[i] = shared / (len(words1) + len(words) - shared)
+                best_index[i] = j
+    return best_similarity, best_index
+
+
+class Command(BaseCommand):
+    help = 'Сравнить сопоставление предложений с полным перебором пар предложений'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--documents',
+            type=int,
+            default=6,
+            help='Число документов; проверяются пары соседних по ID документов',
+        )
+        parser.add_argument(
+            '--sentences',
+            type=int,
+            default=1000,
+            help='Максимальное число предложений каждого текста (полный перебор квадратичен)',
+        )
+
+    def handle(self, *args, **options):
+        texts = []
+        for doc in Document.objects.exclude(txt_file='').exclude(txt_file__isnull=True).order_by('-id')[:options['documents']]:
+            text = read_document_text(doc)
+            if text:
+                sentences = split_sentences(tokenize_text(text)[2])[:options['sentences']]
+                if sentences:
+                    texts.append((doc.id, sentences))
+        if len(texts) < 2:
+            raise CommandError('Для проверки нужны хотя бы два документа с TXT файлами')
+
+        for (doc1_id, sentences1), (doc2_id, sentences2) in zip(texts, texts[1:]):
+            start = time.perf_counter()
+            expected_similarity, expected_index = brute_force_matches(sentences1, sentences2)
+            brute_force_time = time.perf_counter() - start
+
+            index1, index2 = index_sentences(sentences1), index_sentences(sentences2)
+            start = time.perf_counter()
+            best_similarity, best_index = match_sentences(index1, index2)
+            match_time = time.perf_counter() - start
+
+            mismatched = np.flatnonzero((best_similarity != expected_similarity) | (best_index != expected_index))
+            if mismatched.size:
+                i = int(mismatched[0])
+                raise CommandError(
+                    f'Расхождение с перебором для документов {doc1_id} и {doc2_id} ({mismatched.size} предложений): '
+                    f'предложение {i}: {best_similarity[i]:.4f} (#{best_index[i]}) '
+                    f'вместо {expected_similarity[i]:.4f} (#{expected_index[i]})'
+                )
+
+            self.stdout.write(
+                f'{doc1_id} / {doc2_id}: {len(sentences1)} x {len(sentences2)} предложений, '
+                f'перебор {brute_force_time:.2f} с, индекс {match_time:.3f} с'
+            )
+
+        self.stdout.write(self.style.SUCCESS('Сопоставление предложений совпадает с полным перебором'))
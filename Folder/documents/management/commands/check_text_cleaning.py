@@ -0,0 +1,197 @@
+"""
+Management-команда: регрессионная проверка и замер скорости очистки текста (documents.text_clining)
+
+Корпус — тексты элементов страниц PDF-файлов (по умолчанию MEDIA_ROOT/pdf_files) и набор
+пограничных случаев. Каждая функция очистки сравнивается с эталонной реализацией на строковых
+шаблонах re (исходный вид функций), весь документ — с эталонным clean_applications.
+"""
+
+import os
+import re
+import glob
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from documents import text_clining
+
+# Пограничные случаи: регистр, варианты букв re.IGNORECASE (U+1C80, U+1C84), пробельные символы Unicode
+EDGE_CASES = [
+    'Рисунок 1.1 – Схема\nданных\nТаблица 2 — Итоги\nтекст',
+    'рисунок.3-4 подпись\nТАБЛИЦА 5 подпись',
+    'ᲄаблица 7 подпись\nСогласно ᲀ таблице. Далее',
+    'ПР Б (дп) текст пр  в   продолжение',
+    'Как показано на рисунке... 5 и На рисунках\nниже, а также в таблицах.. и на таблице.',
+    'сна рисунке тна таблице втаблице',
+    'Министерство образования Республики Беларусь\nУчреждение\nМинск 2024 Введение',
+    'Рисунок 3 –\xa0диаграмма A Таблица 4 - пример Б [ ] [ ] []',
+    '\n 12 \nтекст\n\x1c3\x1c\nещё текст   конец \n',
+    'Рисунок 12-3-4—5 – подпись\nТаблица1.\n',
+]
+
+HEADING_CASES = [
+    '1 ВВЕДЕНИЕ\n', '1.1 Анализ предметной области\n', 'ЗАКЛЮЧЕНИЕ \n', '2 ОБЗОР\nЛИТЕРАТУРЫ\n',
+    'Глава 1 ..... 5\n', 'ВВЕДЕНИЕ. 3\n', 'А\n', '1.2 анализ\n', '\n', '|a|b|\n', '+--+\n', '-|-\n',
+]
+
+
+def reference_is_table_text(text):
+    if re.match(r'^\|.*\|$', text):
+        return True
+    if re.match(r'^\+[-+]+\+$', text):
+        return True
+    if re.match(r'^[-|+]+$', text):
+        return True
+    return False
+
+
+def reference_is_chapter_heading(text):
+    if '..' in text or re.search(r'\s*\.\s*\d+\s*$', text):
+        return False
+    if len(text.strip()) <= 1:
+        return False
+    chapter_patterns = [
+        r'^\d+\s+[А-Я\s]+$',
+        r'^\d+\.\d+\s+[А-Я][а-я\s]+',
+        r'^[А-Я\s]+$'
+    ]
+    return any(re.match(pattern, text.strip()) for pattern in chapter_patterns)
+
+
+def reference_clean_text(text):
+    text = re.sub(r'\n\s*\d+\s*\n', '\n', text)
+    text = re.sub(r'(Рисунок|Таблица|рисунок\.|таблица\.)\s*\d+([–—\-]?\d+)*\s*[-–—]?\s*.*', '', text, flags=re.IGNORECASE)
+    text = re.sub(r'ПР\s+[А-Я](\s+\([а-я]+\))?', '', text, flags=re.IGNORECASE)
+    text = re.sub(r'\b(на рисунке|На рисунке|На рисунках)\b.*?[\n.]*', '', text, flags=re.IGNORECASE)
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'Министерство образования Республики Беларусь.*?Минск\s*\d{4}', '', text, flags=re.IGNORECASE)
+    text = re.sub(r'Рисунок\s*\d+[-–—]?\s*.*?[A-ZА-Я]', '', text, flags=re.IGNORECASE)
+    text = re.sub(r'\b(в таблице|на таблице|в таблицах|на таблицах)\b.*?[\n.]*', '', text, flags=re.IGNORECASE)
+    text = re.sub(r'Таблица\s*\d+[-–—]?\s*. *?[A-ZА-Я]', '', text, flags=re.IGNORECASE)
+    text = re.sub(r'\[\s*\]', '', text)
+    return text.strip()
+
+
+def reference_clean_applications(text):
+    text = re.sub(r'\n\s*\d+\.\d+.*?\.{2,}\s*\d+\s*\n', '', text, flags=re.DOTALL)
+    text = re.sub(r'(\n\s*)(СПИСОК ИСПОЛЬЗОВАННЫХ ИСТОЧНИКОВ)(\s*\n.*?)(?=\Z)', '', text, flags=re.IGNORECASE | re.DOTALL)
+    text = re.sub(r'\n\s*СОДЕРЖАНИЕ\s*\n.*?(?=\n\s*\d+\.\d+|\n\s*[А-Я]+\s*\n|\Z)', '', text, flags=re.IGNORECASE | re.DOTALL)
+    text = re.sub(r'\n\s*\d+\.\d+.*?\.{2,}\s*\d+\s*\n', '', text)
+    return text
+
+
+def reference_chapters(pages):
+    """(заголовок, сырой текст главы) — исходный автомат глав clean_text_from_pdf"""
+    current_chapter = text_clining.DEFAULT_CHAPTER
+    current_content = []
+    for texts in pages:
+        for text in texts:
+            if reference_is_chapter_heading(text):
+                if current_chapter and current_content:
+                    yield current_chapter, ' '.join(current_content)
+                    current_content = []
+                current_chapter = text
+            else:
+                current_content.append(text)
+    if current_content:
+        yield current_chapter, ' '.join(current_content)
+
+
+class Command(BaseCommand):
+    help = 'Проверить, что очистка текста PDF совпадает с эталонной реализацией, и замерить её скорость'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'paths',
+            nargs='*',
+            help='PDF-файлы или каталоги корпуса (по умолчанию MEDIA_ROOT/pdf_files)',
+        )
+        parser.add_argument(
+            '--backend',
+            choices=sorted(text_clining.PDF_BACKENDS),
+            default='pdfminer',
+            help='Бэкенд извлечения текста для корпуса',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=3,
+            help='Число повторов при замере скорости',
+        )
+
+    def handle(self, *args, **options):
+        pdf_paths = []
+        for path in options['paths'] or [os.path.join(settings.MEDIA_ROOT, 'pdf_files')]:
+            pdf_paths.extend(sorted(glob.glob(os.path.join(path, '*.pdf'))) if os.path.isdir(path) else [path])
+
+        documents = [[EDGE_CASES + HEADING_CASES]]
+        for pdf_path in pdf_paths:
+            try:
+                documents.append(list(text_clining.PDF_BACKENDS[options['backend']](pdf_path)))
+            except Exception as e:
+                self.stdout.write(self.style.WARNING(f'{os.path.basename(pdf_path)}: пропущен ({e})'))
+
+        elements = [text for pages in documents for texts in pages for text in texts]
+        contents = [content for pages in documents for _, content in reference_chapters(pages)] + EDGE_CASES
+        self.stdout.write(f'Корпус: {len(documents) - 1} PDF, {len(elements)} элементов, {len(contents)} глав, '
+                          f'{sum(len(content) for content in contents)} символов')
+
+        mismatches = 0
+        for text in elements:
+            if text_clining.is_table_text(text.strip()) != reference_is_table_text(text.strip()):
+                mismatches += self._report('is_table_text', text)
+            if text_clining.is_chapter_heading(text) != reference_is_chapter_heading(text):
+                mismatches += self._report('is_chapter_heading', text)
+        for content in contents:
+            if text_clining.clean_text(content) != reference_clean_text(content):
+                mismatches += self._report('clean_text', content)
+        for pages in documents:
+            expected = reference_clean_applications('\n\n'.join(
+                f'{chapter}\n{reference_clean_text(content)}' for chapter, content in reference_chapters(pages)
+            ))
+            if ''.join(text_clining.iter_document_text(text_clining.iter_chapters(pages))) != expected:
+                mismatches += self._report('clean_applications', expected)
+
+        timings = {}
+        for name, is_chapter_heading, clean_text in (
+            ('эталон', reference_is_chapter_heading, reference_clean_text),
+            ('text_clining', text_clining.is_chapter_heading, text_clining.clean_text),
+        ):
+            started = time.perf_counter()
+            for _ in range(options['repeat']):
+                for text in elements:
+                    is_chapter_heading(text)
+                for content in contents:
+                    clean_text(content)
+            timings[name] = (time.perf_counter() - started) / options['repeat']
+
+        started = time.perf_counter()
+        for _ in range(options['repeat']):
+            for pages in documents:
+                reference_clean_applications('\n\n'.join(
+                    f'{chapter}\n{content}' for chapter, content in text_clining.iter_chapters(pages)
+                ))
+        reference_applications = (time.perf_counter() - started) / options['repeat']
+        started = time.perf_counter()
+        for _ in range(options['repeat']):
+            for pages in documents:
+                for _piece in text_clining.iter_document_text(text_clining.iter_chapters(pages)):
+                    pass
+        streaming_applications = (time.perf_counter() - started) / options['repeat']
+
+        self.stdout.write(
+            f'Заголовки и clean_text: эталон {timings["эталон"] * 1000:.1f} мс, '
+            f'text_clining {timings["text_clining"] * 1000:.1f} мс '
+            f'(x{timings["эталон"] / max(timings["text_clining"], 1e-9):.1f})'
+        )
+        self.stdout.write(
+            f'Сборка документа: clean_applications по всему тексту {reference_applications * 1000:.1f} мс, '
+            f'потоковая {streaming_applications * 1000:.1f} мс'
+        )
+
+        if mismatches:
+            raise CommandError(f'Расхождений с эталоном: {mismatches}')
+        self.stdout.write(self.style.SUCCESS('Результаты очистки совпадают с эталонной реализацией'))
+
+    def _report(self, function, text):
+        self.stdout.write(self.style.ERROR(f'{function}: расхождение на {text[:200]!r}'))
+        return 1
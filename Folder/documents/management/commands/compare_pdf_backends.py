@@ -0,0 +1,109 @@
+"""
+Management-команда для сравнения бэкендов извлечения текста из PDF (pdfminer и PyMuPDF)
+по тексту и времени обработки
+"""
+
+import os
+import glob
+import time
+import difflib
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from documents import text_clining
+
+# Слов контекста вокруг расхождения при выводе
+DIFF_CONTEXT_WORDS = 8
+
+
+class Command(BaseCommand):
+    help = 'Сравнить тексты и время извлечения PDF бэкендами pdfminer и PyMuPDF на наборе файлов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'paths',
+            nargs='*',
+            help='PDF-файлы или каталоги (по умолчанию MEDIA_ROOT/pdf_files)',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=0,
+            help='Максимальное число файлов (0 — все)',
+        )
+        parser.add_argument(
+            '--diffs',
+            type=int,
+            default=3,
+            help='Сколько расхождений текста выводить для каждого файла',
+        )
+
+    def handle(self, *args, **options):
+        pdf_paths = self._collect_paths(options['paths'] or [os.path.join(settings.MEDIA_ROOT, 'pdf_files')])
+        if options['limit'] > 0:
+            pdf_paths = pdf_paths[:options['limit']]
+        if not pdf_paths:
+            raise CommandError('PDF-файлы не найдены')
+
+        total_time = {'pdfminer': 0.0, 'pymupdf': 0.0}
+        ratios = []
+
+        for pdf_path in pdf_paths:
+            texts = {}
+            elapsed = {}
+            try:
+                for backend in ('pdfminer', 'pymupdf'):
+                    started = time.perf_counter()
+                    texts[backend] = text_clining.clean_text_from_pdf(pdf_path, backend=backend)
+                    elapsed[backend] = time.perf_counter() - started
+            except Exception as e:
+                self.stdout.write(self.style.WARNING(f'{os.path.basename(pdf_path)}: ошибка извлечения ({e})'))
+                continue
+
+            words = {backend: text.split() for backend, text in texts.items()}
+            matcher = difflib.SequenceMatcher(None, words['pdfminer'], words['pymupdf'])
+            ratio = matcher.ratio()
+            ratios.append(ratio)
+            for backend in total_time:
+                total_time[backend] += elapsed[backend]
+
+            self.stdout.write(
+                f'{os.path.basename(pdf_path)}: совпадение слов {ratio:.3f}, '
+                f'глав {self._count_chapters(texts["pdfminer"])} / {self._count_chapters(texts["pymupdf"])}, '
+                f'pdfminer {elapsed["pdfminer"]:.2f} с, pymupdf {elapsed["pymupdf"]:.2f} с '
+                f'(x{elapsed["pdfminer"] / max(elapsed["pymupdf"], 1e-6):.1f})'
+            )
+
+            shown = 0
+            for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+                if tag == 'equal' or shown >= options['diffs']:
+                    continue
+                context = ' '.join(words['pdfminer'][max(0, i1 - DIFF_CONTEXT_WORDS):i1])
+                self.stdout.write(
+                    f'    [{tag}] …{context} '
+                    f'- "{" ".join(words["pdfminer"][i1:i2])[:200]}" '
+                    f'+ "{" ".join(words["pymupdf"][j1:j2])[:200]}"'
+                )
+                shown += 1
+
+        if not ratios:
+            raise CommandError('Ни один файл не удалось обработать обоими бэкендами')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Файлов: {len(ratios)}, среднее совпадение слов {sum(ratios) / len(ratios):.3f}, '
+            f'pdfminer {total_time["pdfminer"]:.1f} с, pymupdf {total_time["pymupdf"]:.1f} с, '
+            f'ускорение x{total_time["pdfminer"] / max(total_time["pymupdf"], 1e-6):.1f}'
+        ))
+
+    @staticmethod
+    def _collect_paths(paths):
+        pdf_paths = []
+        for path in paths:
+            if os.path.isdir(path):
+                pdf_paths.extend(sorted(glob.glob(os.path.join(path, '*.pdf'))))
+            elif os.path.isfile(path):
+                pdf_paths.append(path)
+        return pdf_paths
+
+    @staticmethod
+    def _count_chapters(text):
+        return text.count('\n\n') + 1 if text else 0
@@ -0,0 +1,35 @@
+"""
+Management-команда для построения инвертированного индекса шинглов общей базы
+"""
+
+from django.core.management.base import BaseCommand
+from documents.models import Document
+from documents.vector_models import DocumentShingle
+from documents import shingle_index
+
+
+class Command(BaseCommand):
+    help = 'Перестроить инвертированный индекс шинглов для документов, отправленных на защиту'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--clear',
+            action='store_true',
+            help='Предварительно очистить весь индекс',
+        )
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            DocumentShingle.objects.all().delete()
+            self.stdout.write(self.style.WARNING('Индекс очищен'))
+        
+        # Документы, снятые с защиты, не должны оставаться в индексе
+        DocumentShingle.objects.filter(document__on_defense=False).delete()
+        
+        count = 0
+        for doc in Document.objects.filter(on_defense=True).iterator():
+            postings = shingle_index.index_document(doc)
+            count += 1
+            self.stdout.write(f'  Документ "{doc.name}" (ID: {doc.id}): {postings} шинглов')
+        
+        self.stdout.write(self.style.SUCCESS(f'\nПроиндексировано {count} документов'))
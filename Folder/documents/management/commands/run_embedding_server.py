@@ -0,0 +1,51 @@
+"""
+Management-команда для запуска сервера векторизации (одна модель на все воркеры)
+"""
+
+from django.core.management.base import BaseCommand
+from documents import vector
+from documents.embedding_server import create_server, DEFAULT_MAX_WAIT
+
+
+class Command(BaseCommand):
+    help = 'Запустить HTTP-сервер векторизации с микро-пакетированием запросов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--host',
+            default='127.0.0.1',
+            help='Адрес для прослушивания',
+        )
+        parser.add_argument(
+            '--port',
+            type=int,
+            default=8765,
+            help='Порт для прослушивания',
+        )
+        parser.add_argument(
+            '--max-wait-ms',
+            type=float,
+            default=DEFAULT_MAX_WAIT * 1000,
+            help='Сколько миллисекунд ждать попутных запросов для объединения в пакет',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'Загрузка модели {vector.MODEL_NAME} ({vector.get_embedding_backend()})...')
+        model = vector.get_model()
+        
+        server = create_server(
+            model,
+            options['host'],
+            options['port'],
+            batch_size=vector.get_embedding_batch_size(),
+            max_wait=options['max_wait_ms'] / 1000,
+            info={'model': vector.MODEL_NAME, 'backend': vector.get_embedding_backend()}
+        )
+        self.stdout.write(self.style.SUCCESS(f'Сервер векторизации запущен на http://{options["host"]}:{options["port"]}'))
+        
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
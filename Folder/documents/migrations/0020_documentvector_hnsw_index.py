@@ -0,0 +1,65 @@
+# Generated manually for pgvector candidate search
+
+import json
+
+import numpy as np
+from django.db import migrations
+from pgvector.django import HnswIndex
+
+
+def backfill_document_vectors(apps, schema_editor):
+    Document = apps.get_model('documents', 'Document')
+    DocumentVector = apps.get_model('documents', 'DocumentVector')
+
+    existing = set(DocumentVector.objects.values_list('document_id', flat=True))
+    batch = []
+
+    for doc_id, raw in Document.objects.exclude(vector__isnull=True).values_list('id', 'vector').iterator():
+        if doc_id in existing or not raw:
+            continue
+        try:
+            vector_array = np.array(json.loads(raw), dtype=np.float32)
+        except (ValueError, TypeError):
+            continue
+        if vector_array.shape != (384,):
+            continue
+
+        norm = float(np.linalg.norm(vector_array))
+        batch.append(DocumentVector(
+            document_id=doc_id,
+            vector=vector_array.tolist(),
+            normalized_vector=(vector_array / norm).tolist() if norm > 0 else None,
+            vector_norm=norm,
+        ))
+
+        if len(batch) >= 500:
+            DocumentVector.objects.bulk_create(batch)
+            batch = []
+
+    if batch:
+        DocumentVector.objects.bulk_create(batch)
+
+
+def noop(apps, schema_editor):
+    pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0019_add_defense_fields'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='documentvector',
+            index=HnswIndex(
+                ef_construction=64,
+                fields=['normalized_vector'],
+                m=16,
+                name='vector_normalized_hnsw_idx',
+                opclasses=['vector_cosine_ops'],
+            ),
+        ),
+        migrations.RunPython(backfill_document_vectors, noop),
+    ]
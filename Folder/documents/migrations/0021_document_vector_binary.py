@@ -0,0 +1,55 @@
+# Generated manually: JSON text vectors -> raw float32 bytes
+
+import json
+
+import numpy as np
+from django.db import migrations, models
+
+
+def json_to_binary(apps, schema_editor):
+    Document = apps.get_model('documents', 'Document')
+
+    for doc in Document.objects.exclude(vector__isnull=True).only('id', 'vector').iterator():
+        try:
+            vector_array = np.array(json.loads(doc.vector), dtype='<f4')
+        except (ValueError, TypeError):
+            continue
+        Document.objects.filter(pk=doc.pk).update(vector_blob=vector_array.tobytes())
+
+
+def binary_to_json(apps, schema_editor):
+    Document = apps.get_model('documents', 'Document')
+
+    for doc in Document.objects.exclude(vector_blob__isnull=True).only('id', 'vector_blob').iterator():
+        vector_array = np.frombuffer(doc.vector_blob, dtype='<f4')
+        Document.objects.filter(pk=doc.pk).update(vector=json.dumps(vector_array.tolist()))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0020_documentvector_hnsw_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='vector_blob',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.RunPython(json_to_binary, binary_to_json),
+        migrations.RemoveField(
+            model_name='document',
+            name='vector',
+        ),
+        migrations.RenameField(
+            model_name='document',
+            old_name='vector_blob',
+            new_name='vector',
+        ),
+        migrations.AlterField(
+            model_name='document',
+            name='vector',
+            field=models.BinaryField(blank=True, null=True, verbose_name='Векторное представление текста (float32)'),
+        ),
+    ]
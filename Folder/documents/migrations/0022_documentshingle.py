@@ -0,0 +1,26 @@
+# Generated by Django 4.2.9 on 2026-10-18 19:11
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0021_document_vector_binary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentShingle',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fingerprint', models.BigIntegerField()),
+                ('document', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shingle_postings', to='documents.document')),
+            ],
+            options={
+                'db_table': 'document_shingles',
+                'unique_together': {('fingerprint', 'document')},
+            },
+        ),
+    ]
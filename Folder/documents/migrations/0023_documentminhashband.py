@@ -0,0 +1,26 @@
+# Generated by Django 4.2.9 on 2026-10-18 19:13
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0022_documentshingle'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentMinHashBand',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('band_key', models.BigIntegerField()),
+                ('document', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='minhash_bands', to='documents.document')),
+            ],
+            options={
+                'db_table': 'document_minhash_bands',
+                'unique_together': {('band_key', 'document')},
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated manually: SHA-256 содержимого файла для дедупликации загрузок
+
+import hashlib
+
+from django.db import migrations, models
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def fill_content_hash(apps, schema_editor):
+    Document = apps.get_model('documents', 'Document')
+
+    for doc in Document.objects.filter(content_hash__isnull=True).exclude(data='').only('id', 'data').iterator():
+        digest = hashlib.sha256()
+        try:
+            with doc.data.open('rb') as f:
+                for chunk in f.chunks(HASH_CHUNK_SIZE):
+                    digest.update(chunk)
+        except (OSError, ValueError):
+            continue
+        Document.objects.filter(pk=doc.pk).update(content_hash=digest.hexdigest())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0023_documentminhashband'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, max_length=64, null=True, verbose_name='SHA-256 файла'),
+        ),
+        migrations.RunPython(fill_content_hash, migrations.RunPython.noop),
+    ]
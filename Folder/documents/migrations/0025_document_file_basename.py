@@ -0,0 +1,28 @@
+# Generated manually: имя файла документа в индексированном поле для проверки дубликатов
+
+import os
+
+from django.db import migrations, models
+
+
+def fill_file_basename(apps, schema_editor):
+    Document = apps.get_model('documents', 'Document')
+
+    for doc in Document.objects.exclude(data='').exclude(data__isnull=True).only('id', 'data').iterator():
+        Document.objects.filter(pk=doc.pk).update(file_basename=os.path.basename(doc.data.name))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0024_document_content_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='file_basename',
+            field=models.CharField(blank=True, db_index=True, max_length=255, null=True, verbose_name='Имя файла'),
+        ),
+        migrations.RunPython(fill_file_basename, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated manually: сохранённые результаты сравнения пар документов
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0025_document_file_basename'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='documentsimilarity',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='documentsimilarity',
+            name='comparison',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='documentsimilarity',
+            name='document1_content_hash',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='documentsimilarity',
+            name='document2_content_hash',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='documentsimilarity',
+            name='comparison_version',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
@@ -0,0 +1,67 @@
+"""
+MinHash-сигнатуры наборов шинглов и ключи LSH-бакетов для поиска почти-дубликатов
+"""
+
+import numpy as np
+
+# Число хеш-функций в сигнатуре
+MINHASH_PERMUTATIONS = 128
+# Разбиение сигнатуры на полосы: BANDS * ROWS == MINHASH_PERMUTATIONS.
+# Документы попадают в общий бакет с вероятностью 1 - (1 - J^ROWS)^BANDS,
+# порог срабатывания ~ (1 / BANDS) ** (1 / ROWS) ≈ 0.42
+LSH_BANDS = 32
+LSH_ROWS = 4
+# Размер блока шинглов при вычислении сигнатуры (ограничивает память промежуточной матрицы)
+MINHASH_CHUNK_SIZE = 2048
+
+EMPTY_SIGNATURE_VALUE = np.iinfo(np.uint64).max
+
+# Хеш-функции вида (a * x + b) mod 2^64 с нечётным a — перестановки пространства uint64.
+# Коэффициенты фиксированы, чтобы сигнатуры, сохранённые в разное время, были сравнимы
+_rng = np.random.Generator(np.random.PCG64(20240917))
+_PERM_A = _rng.integers(0, EMPTY_SIGNATURE_VALUE, size=MINHASH_PERMUTATIONS, dtype=np.uint64, endpoint=True) | np.uint64(1)
+_PERM_B = _rng.integers(0, EMPTY_SIGNATURE_VALUE, size=MINHASH_PERMUTATIONS, dtype=np.uint64, endpoint=True)
+_ROW_MULTIPLIERS = _rng.integers(0, EMPTY_SIGNATURE_VALUE, size=LSH_ROWS, dtype=np.uint64, endpoint=True) | np.uint64(1)
+_BAND_SALTS = _rng.integers(0, EMPTY_SIGNATURE_VALUE, size=LSH_BANDS, dtype=np.uint64, endpoint=True)
+del _rng
+
+
+def minhash_signature(shingles: np.ndarray) -> np.ndarray:
+    """
+    Вычисляет MinHash-сигнатуру набора отпечатков шинглов (uint64).
+    Для пустого набора все позиции равны максимальному значению.
+    """
+    signature = np.full(MINHASH_PERMUTATIONS, EMPTY_SIGNATURE_VALUE, dtype=np.uint64)
+    shingles = np.asarray(shingles, dtype=np.uint64)
+
+    for start in range(0, shingles.size, MINHASH_CHUNK_SIZE):
+        chunk = shingles[start:start + MINHASH_CHUNK_SIZE, None]
+        # Переполнение uint64 здесь ожидаемо: вычисления идут по модулю 2^64
+        hashed = chunk * _PERM_A
+        hashed += _PERM_B
+        np.minimum(signature, hashed.min(axis=0), out=signature)
+
+    return signature
+
+
+def lsh_band_keys(signature: np.ndarray) -> np.ndarray:
+    """
+    Ключи бакетов LSH: по одному на полосу сигнатуры, с солью полосы,
+    чтобы одинаковые значения в разных полосах не совпадали.
+    Возвращает int64 для хранения в столбце bigint.
+    """
+    bands = np.asarray(signature, dtype=np.uint64).reshape(LSH_BANDS, LSH_ROWS)
+    keys = (bands * _ROW_MULTIPLIERS).sum(axis=1, dtype=np.uint64)
+    keys ^= _BAND_SALTS
+    return keys.view(np.int64)
+
+
+def estimate_jaccard(signature1: np.ndarray, signature2: np.ndarray) -> float:
+    """Оценка коэффициента Жаккара по доле совпадающих позиций сигнатур"""
+    if signature1 is None or signature2 is None:
+        return 0.0
+    if signature1.shape != signature2.shape:
+        return 0.0
+    if (signature1 == EMPTY_SIGNATURE_VALUE).all() or (signature2 == EMPTY_SIGNATURE_VALUE).all():
+        return 0.0
+    return float(np.count_nonzero(signature1 == signature2)) / signature1.size
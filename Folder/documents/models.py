@@ -1,19 +1,20 @@
 import os
 import time
-import json
 import numpy as np
 from django.db import models
-from django.db.models.signals import post_save
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
-from documents import text_clining, vector, sim_cos
+from documents import text_clining, vector, sim_cos, fingerprints, deduplication
+from documents.utils_cache import invalidate_vector_cache
 from users.models import User
 from django.contrib import admin
 from django.utils.html import format_html
-from documents.vector_models import DocumentVector, DocumentSimilarity, DocumentBatch, DocumentProcessingQueue
+from documents.vector_models import DocumentVector, DocumentSimilarity, DocumentShingle, DocumentMinHashBand, DocumentBatch, DocumentProcessingQueue
 
 # Глобальные переменные для косинусного сходства и параметров
 COSIM_THRESHOLD = 0.9  # Порог схожести для определения плагиата
 WORDS_PER_BLOCK = 300  # Количество слов для каждого блока (можно настроить)
+VECTOR_DTYPE = np.dtype('<f4')  # Формат хранения векторов: little-endian float32
 
 
 # Модель для хранения статуса документа
@@ -67,8 +68,10 @@ class Document(models.Model):
     type = models.ForeignKey(to=Type, on_delete=models.CASCADE, default=1)
     time_created = models.DateTimeField(auto_now_add=True, verbose_name='Дата и время загрузки документа')
     data = models.FileField(upload_to="documents/", verbose_name='документ')
+    content_hash = models.CharField(max_length=64, blank=True, null=True, db_index=True, verbose_name='SHA-256 файла')
+    file_basename = models.CharField(max_length=255, blank=True, null=True, db_index=True, verbose_name='Имя файла')
     txt_file = models.FileField(upload_to='txt_files/', blank=True, null=True)
-    vector = models.TextField(blank=True, null=True, verbose_name='Векторное представление текста (JSON)')
+    vector = models.BinaryField(blank=True, null=True, verbose_name='Векторное представление текста (float32)')
     last_status_changed_by = models.ForeignKey(User, on_delete=models.SET_NULL, blank=True, null=True, related_name='status_changed_docs')
     
     # Поля для асинхронной обработки через Celery
@@ -110,22 +113,34 @@ class Document(models.Model):
                 return "Не удалось загрузить текст."
         return "Текстовый файл не найден."
 
-    def get_vector_array(self):
-        """Возвращает вектор как numpy array."""
-        if self.vector:
+    @staticmethod
+    def encode_vector(vector_array):
+        """Кодирует вектор в сырые байты little-endian float32."""
+        return np.ascontiguousarray(vector_array, dtype=VECTOR_DTYPE).tobytes()
+
+    @staticmethod
+    def decode_vector(raw):
+        """Декодирует сохранённое значение поля vector в numpy array без копирования."""
+        if raw:
             try:
-                vector_data = json.loads(self.vector)
-                return np.array(vector_data)
-            except (json.JSONDecodeError, ValueError):
+                return np.frombuffer(raw, dtype=VECTOR_DTYPE)
+            except (ValueError, TypeError):
                 return None
         return None
 
+    def get_vector_array(self):
+        """Возвращает вектор как numpy array."""
+        return self.decode_vector(self.vector)
+
     def set_vector_array(self, vector_array):
         """Устанавливает вектор из numpy array."""
         if vector_array is not None:
-            self.vector = json.dumps(vector_array.tolist())
+            self.vector = self.encode_vector(vector_array)
         else:
             self.vector = None
+        if self.pk:
+            # Кэшированный вектор документа устарел
+            invalidate_vector_cache(self.pk)
 
 
     def calculate_originality(self):
@@ -259,6 +274,43 @@ class Document(models.Model):
 #         instance.calculate_originality()
 
 
+@receiver(pre_save, sender=Document)
+def set_document_content_hash(sender, instance, **kwargs):
+    """Хеширует содержимое файла при загрузке (и для документов, сохранённых до появления хеша)"""
+    update_fields = kwargs.get('update_fields')
+    if update_fields is not None and 'content_hash' not in update_fields:
+        return
+    if not instance.data or (instance.content_hash and instance.data._committed):
+        return
+    try:
+        instance.content_hash = deduplication.compute_file_hash(instance.data)
+    except (OSError, ValueError) as e:
+        print(f"Не удалось вычислить хеш файла документа: {e}")
+    finally:
+        # Сохранённый файл открыт только для хеширования; загружаемый ещё нужен хранилищу
+        if instance.data._committed:
+            instance.data.close()
+
+
+@receiver(post_save, sender=Document)
+def set_document_file_basename(sender, instance, **kwargs):
+    """
+    Сохраняет имя файла для индексированной проверки дубликатов по имени.
+    Берётся после сохранения: хранилище может изменить имя загруженного файла.
+    """
+    file_basename = os.path.basename(instance.data.name) if instance.data else None
+    if instance.file_basename != file_basename:
+        instance.file_basename = file_basename
+        Document.objects.filter(pk=instance.pk).update(file_basename=file_basename)
+
+
+@receiver(post_delete, sender=Document)
+def delete_document_fingerprints(sender, instance, **kwargs):
+    """Удаляет файл отпечатков шинглов и вектор в кэше вместе с документом"""
+    fingerprints.delete_fingerprints(instance.id)
+    invalidate_vector_cache(instance.id)
+
+
 @admin.register(Document)
 class DocumentAdmin(admin.ModelAdmin):
     list_display = ('name', 'get_text_preview', 'status', 'on_defense', 'time_created')
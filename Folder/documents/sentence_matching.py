@@ -0,0 +1,210 @@
+"""
+Сопоставление предложений двух текстов: для каждого предложения проверяемого текста
+находится наиболее похожее предложение источника (коэффициент Жаккара множеств слов).
+
+Пары предложений, делящие хотя бы одно нечастое слово, находятся соединением
+по инвертированному индексу слов источника. До FREQUENT_WORDS_LIMIT самых частых
+слов источника (служебные, общая терминология) в соединении не участвуют,
+а учитываются в пересечении через 64-битные маски — поэтому соединение растёт
+примерно линейно с длиной текстов.
+
+Пары, общие слова которых все частые, сравниваются только по маскам и только для
+предложений, у которых такая пара ещё может превзойти лучшую найденную соединением
+(общих частых слов не больше, чем частых слов в предложении). Результат совпадает
+с полным перебором пар (проверка: manage.py check_sentence_matching).
+"""
+
+import re
+from typing import List, NamedTuple, Tuple
+
+import numpy as np
+
+from documents.sim_cos import tokens_to_ids
+
+SENTENCE_SPLIT_RE = re.compile(r'[.!?]+')
+
+# Не более стольких частых слов кодируется в 64-битной маске предложения
+FREQUENT_WORDS_LIMIT = 64
+# Слово источника считается частым, если встречается в большей доле предложений
+FREQUENT_WORD_SHARE = 0.05
+FREQUENT_WORD_MIN_SENTENCES = 8
+
+# Предложений за один шаг сравнения по маскам (матрица шаг x число предложений источника)
+MASK_CHUNK_SIZE = 256
+
+_M1 = np.uint64(0x5555555555555555)
+_M2 = np.uint64(0x3333333333333333)
+_M4 = np.uint64(0x0F0F0F0F0F0F0F0F)
+_H01 = np.uint64(0x0101010101010101)
+
+
+def split_sentences(text: str) -> List[str]:
+    """Делит (нормализованный) текст на непустые предложения"""
+    return [s.strip() for s in SENTENCE_SPLIT_RE.split(text) if s.strip()]
+
+
+class SentenceIndex(NamedTuple):
+    """
+    Слова предложений текста: пары (номер предложения, отпечаток слова) по уникальным
+    словам каждого предложения и число уникальных слов в каждом предложении.
+    """
+    sentence_idx: np.ndarray
+    words: np.ndarray
+    lengths: np.ndarray
+
+    @property
+    def count(self) -> int:
+        return int(self.lengths.size)
+
+
+def index_sentences(sentences: List[str]) -> SentenceIndex:
+    """Строит индекс слов предложений (один раз на текст)"""
+    if not sentences:
+        return SentenceIndex(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.uint64), np.empty(0, dtype=np.int64))
+
+    sentence_words = [sentence.split() for sentence in sentences]
+    word_counts = np.fromiter((len(words) for words in sentence_words), dtype=np.int64, count=len(sentence_words))
+
+    # Все слова текста переводятся в отпечатки одним вызовом
+    words = tokens_to_ids([word for words in sentence_words for word in words])
+    sentence_idx = np.repeat(np.arange(len(sentences), dtype=np.int64), word_counts)
+
+    # Уникальные слова внутри каждого предложения
+    order = np.lexsort((words, sentence_idx))
+    sentence_idx, words = sentence_idx[order], words[order]
+    keep = np.ones(words.size, dtype=bool)
+    keep[1:] = (sentence_idx[1:] != sentence_idx[:-1]) | (words[1:] != words[:-1])
+    sentence_idx, words = sentence_idx[keep], words[keep]
+
+    lengths = np.bincount(sentence_idx, minlength=len(sentences)).astype(np.int64)
+    return SentenceIndex(sentence_idx, words, lengths)
+
+
+def _frequent_word_masks(sentence_idx: np.ndarray, words: np.ndarray,
+                         frequent: np.ndarray, sentence_count: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Строит 64-битные маски частых слов для предложений.
+    Возвращает маски и признак «слово частое» для каждой пары.
+    """
+    masks = np.zeros(sentence_count, dtype=np.uint64)
+    if frequent.size == 0:
+        return masks, np.zeros(words.size, dtype=bool)
+
+    positions = np.searchsorted(frequent, words)
+    positions[positions == frequent.size] = 0
+    is_frequent = frequent[positions] == words
+
+    bits = np.left_shift(np.uint64(1), positions[is_frequent].astype(np.uint64))
+    np.bitwise_or.at(masks, sentence_idx[is_frequent], bits)
+    return masks, is_frequent
+
+
+def _popcount(values: np.ndarray) -> np.ndarray:
+    """Число единичных битов каждого элемента uint64-массива любой формы"""
+    values = values - ((values >> np.uint64(1)) & _M1)
+    values = (values & _M2) + ((values >> np.uint64(2)) & _M2)
+    values = (values + (values >> np.uint64(4))) & _M4
+    return ((values * _H01) >> np.uint64(56)).astype(np.int64)
+
+
+def _match_frequent_only(best_similarity: np.ndarray, best_index: np.ndarray,
+                         masks1: np.ndarray, lengths1: np.ndarray, masks2: np.ndarray, lengths2: np.ndarray):
+    """
+    Уточняет лучшие совпадения парами, которые соединение не нашло (общие только частые слова).
+    Схожесть такой пары не больше (частых слов в предложении) / (слов в предложении),
+    поэтому по маскам сравниваются только предложения, где эта граница не ниже лучшей схожести.
+    Для пар, найденных соединением, схожесть по маскам не выше точной и результат не портит.
+    """
+    frequent_counts1 = _popcount(masks1)
+    # Допуск на округление: при равной схожести решает номер предложения источника
+    rows = np.flatnonzero((frequent_counts1 > 0) & (frequent_counts1 >= best_similarity * lengths1 - 1e-9))
+
+    for start in range(0, rows.size, MASK_CHUNK_SIZE):
+        chunk = rows[start:start + MASK_CHUNK_SIZE]
+        shared = _popcount(masks1[chunk, None] & masks2[None, :])
+        similarity = shared / (lengths1[chunk, None] + lengths2[None, :] - shared)
+
+        # argmax — первое (более раннее предложение источника) среди равных
+        candidate = similarity.argmax(axis=1)
+        candidate_similarity = similarity[np.arange(chunk.size), candidate]
+        better = (candidate_similarity > best_similarity[chunk]) | (
+            (candidate_similarity == best_similarity[chunk]) & (candidate_similarity > 0) & (candidate < best_index[chunk])
+        )
+        best_similarity[chunk[better]] = candidate_similarity[better]
+        best_index[chunk[better]] = candidate[better]
+
+
+def best_sentence_matches(sentences1: List[str], sentences2: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Для каждого предложения sentences1 находит лучшее совпадение в sentences2 (см. match_sentences)"""
+    return match_sentences(index_sentences(sentences1), index_sentences(sentences2))
+
+
+def match_sentences(index1: SentenceIndex, index2: SentenceIndex) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Для каждого предложения первого текста находит лучшее совпадение во втором
+    (наибольший коэффициент Жаккара, при равенстве — более раннее предложение источника).
+
+    Returns:
+        (схожесть лучшего совпадения float64[index1.count],
+         номер предложения источника int64[index1.count], -1 если совпадения нет)
+    """
+    best_similarity = np.zeros(index1.count, dtype=np.float64)
+    best_index = np.full(index1.count, -1, dtype=np.int64)
+    if not index1.count or not index2.count:
+        return best_similarity, best_index
+
+    sentence_count2 = index2.count
+    sentence_idx1, words1, lengths1 = index1
+    sentence_idx2, words2, lengths2 = index2
+
+    # Частые слова источника по числу предложений, в которых они встречаются
+    vocabulary2, frequency2 = np.unique(words2, return_counts=True)
+    frequent = np.flatnonzero(frequency2 > max(FREQUENT_WORD_MIN_SENTENCES, FREQUENT_WORD_SHARE * sentence_count2))
+    if frequent.size > FREQUENT_WORDS_LIMIT:
+        frequent = frequent[np.argsort(-frequency2[frequent], kind='stable')[:FREQUENT_WORDS_LIMIT]]
+    frequent = np.sort(vocabulary2[frequent])
+
+    masks1, is_frequent1 = _frequent_word_masks(sentence_idx1, words1, frequent, index1.count)
+    masks2, is_frequent2 = _frequent_word_masks(sentence_idx2, words2, frequent, sentence_count2)
+
+    # Инвертированный индекс нечастых слов источника: отсортированные слова и номера предложений
+    rare_sentences1, rare_words1 = sentence_idx1[~is_frequent1], words1[~is_frequent1]
+    order = np.argsort(words2[~is_frequent2], kind='stable')
+    rare_words2 = words2[~is_frequent2][order]
+    rare_sentences2 = sentence_idx2[~is_frequent2][order]
+
+    # Соединение: каждому слову проверяемого текста — все предложения источника с этим словом
+    starts = np.searchsorted(rare_words2, rare_words1, side='left')
+    counts = np.searchsorted(rare_words2, rare_words1, side='right') - starts
+    total = int(counts.sum())
+    if total == 0:
+        _match_frequent_only(best_similarity, best_index, masks1, lengths1, masks2, lengths2)
+        return best_similarity, best_index
+
+    offsets = np.repeat(starts - (np.cumsum(counts) - counts), counts)
+    pair_keys = np.repeat(rare_sentences1, counts) * sentence_count2 + rare_sentences2[np.arange(total) + offsets]
+
+    # Число общих нечастых слов для каждой пары предложений
+    pair_keys, shared = np.unique(pair_keys, return_counts=True)
+    pair_sentences1 = pair_keys // sentence_count2
+    pair_sentences2 = pair_keys % sentence_count2
+
+    shared = shared + _popcount(masks1[pair_sentences1] & masks2[pair_sentences2])
+    similarity = shared / (lengths1[pair_sentences1] + lengths2[pair_sentences2] - shared)
+
+    # Лучшая пара для каждого предложения (при равенстве — более раннее предложение источника).
+    # Пары уже упорядочены по (предложение, предложение источника), поэтому группы идут подряд
+    group_starts = np.flatnonzero(np.concatenate(([True], pair_sentences1[1:] != pair_sentences1[:-1])))
+    group_best = np.maximum.reduceat(similarity, group_starts)
+    is_best = similarity == np.repeat(group_best, np.diff(np.append(group_starts, similarity.size)))
+
+    best_positions = np.flatnonzero(is_best)
+    best_sentences1 = pair_sentences1[best_positions]
+    first = best_positions[np.concatenate(([True], best_sentences1[1:] != best_sentences1[:-1]))]
+
+    best_similarity[pair_sentences1[first]] = similarity[first]
+    best_index[pair_sentences1[first]] = pair_sentences2[first]
+
+    # Пары, общие слова которых все частые
+    _match_frequent_only(best_similarity, best_index, masks1, lengths1, masks2, lengths2)
+    return best_similarity, best_index
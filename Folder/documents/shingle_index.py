@@ -0,0 +1,147 @@
+"""
+Индексы общей базы: инвертированный индекс шинглов для поиска точных совпадений
+фрагментов и LSH-индекс MinHash-сигнатур для поиска почти-дубликатов
+"""
+
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from django.db import connection, transaction
+
+from documents.fingerprints import load_fingerprints
+from documents.minhash import lsh_band_keys, estimate_jaccard
+from documents.vector_models import DocumentShingle, DocumentMinHashBand
+
+logger = logging.getLogger(__name__)
+
+# Индексируются шинглы размера 5 нормализованного текста
+INDEX_SHINGLE_KEY = 'clean_5'
+# В индекс попадает только каждый N-й отпечаток (отбор по модулю, одинаковый для всех документов)
+INDEX_SAMPLING = 8
+BULK_BATCH_SIZE = 5000
+# Сколько кандидатов из бакетов LSH проверяется по сигнатурам на один возвращаемый документ
+NEAR_DUPLICATE_CANDIDATES_FACTOR = 5
+
+
+def select_index_fingerprints(fingerprints: Dict[str, np.ndarray]) -> np.ndarray:
+    """
+    Отбирает отпечатки для индекса (fingerprint mod INDEX_SAMPLING == 0)
+    и переводит их в знаковый int64 для столбца bigint.
+    """
+    shingles = fingerprints[INDEX_SHINGLE_KEY]
+    sampled = shingles[shingles % np.uint64(INDEX_SAMPLING) == 0]
+    return sampled.view(np.int64)
+
+
+def index_document(document) -> int:
+    """
+    Добавляет (или переиндексирует) документ в индексе. Возвращает число записей.
+    """
+    fingerprints = load_fingerprints(document)
+    if fingerprints is None:
+        logger.warning(f"Нет текста для индексации документа {document.id}")
+        return 0
+
+    sampled = select_index_fingerprints(fingerprints)
+
+    band_keys = lsh_band_keys(fingerprints['minhash'])
+
+    with transaction.atomic():
+        DocumentShingle.objects.filter(document_id=document.id).delete()
+        for start in range(0, sampled.size, BULK_BATCH_SIZE):
+            DocumentShingle.objects.bulk_create(
+                [
+                    DocumentShingle(fingerprint=int(value), document_id=document.id)
+                    for value in sampled[start:start + BULK_BATCH_SIZE]
+                ],
+                ignore_conflicts=True
+            )
+
+        DocumentMinHashBand.objects.filter(document_id=document.id).delete()
+        DocumentMinHashBand.objects.bulk_create(
+            [DocumentMinHashBand(band_key=int(key), document_id=document.id) for key in band_keys],
+            ignore_conflicts=True
+        )
+
+    return int(sampled.size)
+
+
+def unindex_document(document):
+    """Удаляет документ из индексов"""
+    DocumentShingle.objects.filter(document_id=document.id).delete()
+    DocumentMinHashBand.objects.filter(document_id=document.id).delete()
+
+
+def find_overlapping_documents(fingerprints: Dict[str, np.ndarray], min_shared: int = 5,
+                               exclude_ids: Optional[Iterable[int]] = None,
+                               limit: int = 10) -> List[Tuple[int, int]]:
+    """
+    Находит документы общей базы, разделяющие с текстом не менее min_shared отобранных шинглов.
+    Время ответа зависит от размера проверяемого текста, а не от размера базы.
+
+    Returns:
+        Список пар (ID документа, число общих отобранных шинглов) по убыванию
+    """
+    sampled = select_index_fingerprints(fingerprints)
+    if sampled.size == 0:
+        return []
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT s.document_id, COUNT(*) AS shared
+            FROM {DocumentShingle._meta.db_table} s
+            WHERE s.fingerprint = ANY(%s) AND NOT (s.document_id = ANY(%s))
+            GROUP BY s.document_id
+            HAVING COUNT(*) >= %s
+            ORDER BY shared DESC
+            LIMIT %s
+            """,
+            [sampled.tolist(), list(exclude_ids or []), min_shared, limit]
+        )
+        return [(doc_id, shared) for doc_id, shared in cursor.fetchall()]
+
+
+def find_near_duplicates(fingerprints: Dict[str, np.ndarray], threshold: float = 0.4,
+                         exclude_ids: Optional[Iterable[int]] = None,
+                         limit: int = 10) -> List[Tuple[object, float]]:
+    """
+    Находит почти-дубликаты в общей базе через LSH: просматриваются только документы,
+    попавшие хотя бы в один общий бакет, а их схожесть оценивается по MinHash-сигнатурам.
+
+    Returns:
+        Список пар (документ, оценка коэффициента Жаккара) по убыванию
+    """
+    from documents.models import Document
+
+    signature = fingerprints.get('minhash')
+    if signature is None:
+        return []
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT b.document_id
+            FROM {DocumentMinHashBand._meta.db_table} b
+            WHERE b.band_key = ANY(%s) AND NOT (b.document_id = ANY(%s))
+            GROUP BY b.document_id
+            ORDER BY COUNT(*) DESC
+            LIMIT %s
+            """,
+            [lsh_band_keys(signature).tolist(), list(exclude_ids or []), limit * NEAR_DUPLICATE_CANDIDATES_FACTOR]
+        )
+        candidate_ids = [row[0] for row in cursor.fetchall()]
+
+    near_duplicates = []
+    for doc in Document.objects.filter(id__in=candidate_ids, on_defense=True):
+        candidate_fingerprints = load_fingerprints(doc)
+        if candidate_fingerprints is None:
+            continue
+
+        similarity = estimate_jaccard(signature, candidate_fingerprints['minhash'])
+        if similarity >= threshold:
+            near_duplicates.append((doc, similarity))
+
+    near_duplicates.sort(key=lambda x: x[1], reverse=True)
+    return near_duplicates[:limit]
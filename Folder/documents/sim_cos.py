@@ -1,42 +1,118 @@
+import re
 import hashlib
+from functools import lru_cache
+
+import numpy as np
+
+# Основание полиномиального хэша шинглов (нечётное, арифметика по модулю 2^64)
+SHINGLE_HASH_BASE = np.uint64(0x100000001B3)
+EMPTY_SHINGLES = np.empty(0, dtype=np.uint64)
+
+
+def normalize_text(text):
+    """
+    Нормализует текст для сравнения: нижний регистр, одиночные пробелы.
+    """
+    return re.sub(r'\s+', ' ', text.lower()).strip()
+
+
+def tokenize_text(text):
+    """
+    Разбивает текст на токены один раз для всех метрик.
+    Возвращает (токены исходного текста, токены нормализованного текста, нормализованный текст);
+    нормализованные токены совпадают с normalize_text(text).split().
+    """
+    raw_tokens = text.split()
+    clean_tokens = [token.lower() for token in raw_tokens]
+    return raw_tokens, clean_tokens, ' '.join(clean_tokens)
+
+
+@lru_cache(maxsize=1 << 17)
+def token_fingerprint(token):
+    """
+    Возвращает стабильный 64-битный отпечаток токена.
+    """
+    return int.from_bytes(hashlib.blake2b(token.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def tokens_to_ids(tokens):
+    """
+    Переводит список токенов в массив 64-битных отпечатков (np.uint64).
+    """
+    return np.fromiter((token_fingerprint(token) for token in tokens), dtype=np.uint64, count=len(tokens))
+
+
+def shingle_fingerprints(token_ids, shingle_size=5):
+    """
+    Вычисляет отпечатки шинглов скользящим полиномиальным хэшем над массивом ID токенов.
+    Возвращает отсортированный массив уникальных np.uint64.
+    """
+    count = len(token_ids) - shingle_size + 1
+    if count <= 0:
+        return EMPTY_SHINGLES
+
+    hashes = token_ids[:count].copy()
+    for offset in range(1, shingle_size):
+        # Переполнение uint64 — это и есть взятие по модулю 2^64
+        hashes *= SHINGLE_HASH_BASE
+        hashes += token_ids[offset:offset + count]
+
+    return np.unique(hashes)
+
 
 def generate_hashed_shingles(text, shingle_size=5):
     """
     Создаёт хэшированные шинглы для текста.
+    Возвращает отсортированный массив уникальных 64-битных отпечатков.
     """
-    tokens = text.split()
-    shingles = [' '.join(tokens[i:i + shingle_size]) for i in range(len(tokens) - shingle_size + 1)]
-    hashed_shingles = {hashlib.md5(shingle.encode('utf-8')).hexdigest() for shingle in shingles}
-    return hashed_shingles
+    return shingle_fingerprints(tokens_to_ids(text.split()), shingle_size)
+
+
+def intersection_size(shingles1, shingles2):
+    """
+    Считает размер пересечения двух отсортированных массивов уникальных отпечатков.
+    """
+    if shingles1.size == 0 or shingles2.size == 0:
+        return 0
+    if shingles1.size > shingles2.size:
+        shingles1, shingles2 = shingles2, shingles1
+
+    positions = np.searchsorted(shingles2, shingles1)
+    positions[positions == shingles2.size] = 0
+    return int(np.count_nonzero(shingles2[positions] == shingles1))
+
 
 def coef_similarity_hashed(shingles1, shingles2):
     """
-    Рассчитывает коэффициент схожести для двух наборов хэшированных шинглов.
+    Рассчитывает коэффициент схожести (Жаккара) для двух наборов хэшированных шинглов.
     """
-    intersection = len(shingles1 & shingles2)
-    union = len(shingles1 | shingles2)  # Исправлено: теперь используется объединение множеств
+    intersection = intersection_size(shingles1, shingles2)
+    union = shingles1.size + shingles2.size - intersection
     return intersection / union if union > 0 else 0
 
-def calculate_originality_large_texts(user_doc, similar_docs, shingle_size=5):
+def originality_from_shingles(user_shingles, db_shingles_list):
     """
-    Рассчитывает процент оригинальности для большого текста.
-    Пример использования:
-    print(f"Процент оригинальности: {originality:.2f}%")
+    Рассчитывает процент оригинальности по готовым наборам шинглов.
     """
-    user_shingles = generate_hashed_shingles(user_doc, shingle_size)
-
-    all_db_shingles = set()
+    all_db_shingles = np.unique(np.concatenate(db_shingles_list)) if db_shingles_list else EMPTY_SHINGLES
 
-    for doc in similar_docs:
-        db_shingles = generate_hashed_shingles(doc, shingle_size)
-        all_db_shingles.update(db_shingles)
-    
     similarity = coef_similarity_hashed(user_shingles, all_db_shingles)
 
     originality = 100 - (similarity * 100) - 0.01
 
     return originality
 
+def calculate_originality_large_texts(user_doc, similar_docs, shingle_size=5):
+    """
+    Рассчитывает процент оригинальности для большого текста.
+    Пример использования:
+    print(f"Процент оригинальности: {originality:.2f}%")
+    """
+    user_shingles = generate_hashed_shingles(user_doc, shingle_size)
+    db_shingles = [generate_hashed_shingles(doc, shingle_size) for doc in similar_docs]
+
+    return originality_from_shingles(user_shingles, db_shingles)
+
 def calculate_similarity_by_source(user_doc, similar_doc, shingle_size=5):
     """
     Рассчитывает процент совпадений между проверяемым документом и одним источником.
@@ -59,7 +135,13 @@ def calculate_similarity_by_source(user_doc, similar_doc, shingle_size=5):
     user_shingles = generate_hashed_shingles(user_doc, shingle_size)
     source_shingles = generate_hashed_shingles(similar_doc, shingle_size)
     
-    if not user_shingles or not source_shingles:
+    return similarity_by_source_from_shingles(user_shingles, source_shingles)
+
+def similarity_by_source_from_shingles(user_shingles, source_shingles):
+    """
+    Рассчитывает процент совпадений с источником по готовым наборам шинглов.
+    """
+    if user_shingles.size == 0 or source_shingles.size == 0:
         return 0.0
     
     similarity = coef_similarity_hashed(user_shingles, source_shingles)
@@ -93,15 +175,21 @@ def detect_citations(user_doc, similar_doc, shingle_size=3):
     user_shingles = generate_hashed_shingles(user_doc, shingle_size)
     source_shingles = generate_hashed_shingles(similar_doc, shingle_size)
     
-    if not user_shingles:
+    return citations_from_shingles(user_shingles, source_shingles)
+
+def citations_from_shingles(user_shingles, source_shingles):
+    """
+    Рассчитывает процент цитирований по готовым наборам коротких шинглов.
+    """
+    if user_shingles.size == 0:
         return 0.0
     
     # Находим короткие совпадения (потенциальные цитаты)
-    short_matches = user_shingles & source_shingles
+    short_matches = intersection_size(user_shingles, source_shingles)
     
     # Рассчитываем процент цитирований относительно общего объема текста проверяемого документа
     # Это показывает, какая доля текста пользователя совпадает с источником
-    citation_percent = (len(short_matches) / len(user_shingles)) * 100
+    citation_percent = (short_matches / user_shingles.size) * 100
     
     return max(0.0, min(100.0, citation_percent))  # Ограничиваем от 0 до 100
 
@@ -0,0 +1,55 @@
+"""
+Распараллеливание тяжёлых шагов проверки подзадачами Celery.
+
+Процессы prefork-воркера Celery демонические и не могут запускать собственные пулы
+процессов, поэтому части работы (группы кандидатов, диапазоны страниц PDF) отправляются
+группой подзадач в очередь PARALLEL_TASK_QUEUE. Её должен обслуживать отдельный воркер
+(сервис celery_parallel в docker-compose): задача проверки ждёт результаты подзадач,
+и если бы они попадали в её же очередь, при занятых процессах воркера ожидание
+не завершилось бы.
+"""
+
+import logging
+from typing import Iterable, Iterator, Optional
+
+from celery import group
+from celery.result import GroupResult
+from django.conf import settings
+from kombu.exceptions import OperationalError
+
+logger = logging.getLogger(__name__)
+
+
+def get_parallel_queue() -> str:
+    return getattr(settings, 'PARALLEL_TASK_QUEUE', 'parallel')
+
+
+def dispatch_group(signatures: Iterable) -> Optional[GroupResult]:
+    """
+    Отправляет подзадачи в очередь PARALLEL_TASK_QUEUE.
+    Возвращает None, если брокер недоступен — тогда работа выполняется в текущем процессе.
+    """
+    try:
+        return group(list(signatures)).apply_async(queue=get_parallel_queue())
+    except (OperationalError, OSError) as e:
+        logger.warning(f"Не удалось отправить подзадачи в очередь {get_parallel_queue()}, "
+                       f"работа выполняется в текущем процессе: {e}")
+        return None
+
+
+def iter_group_results(group_result: GroupResult) -> Iterator:
+    """
+    Результаты подзадач в порядке их отправки, по мере готовности.
+    Исключение подзадачи пробрасывается; при досрочном выходе оставшиеся подзадачи отзываются.
+    """
+    timeout = getattr(settings, 'PARALLEL_TASK_TIMEOUT', 600)
+    finished = False
+    try:
+        for result in group_result.results:
+            # Ожидание идёт из задачи, но подзадачи выполняет воркер другой очереди
+            yield result.get(timeout=timeout, disable_sync_subtasks=False)
+        finished = True
+    finally:
+        if not finished:
+            group_result.revoke()
+        group_result.forget()
@@ -8,7 +8,8 @@ from django.utils import timezone
 from django.conf import settings
 
 from documents.models import Document, Status
-from documents import text_clining, vector
+from documents.vector_models import DocumentVector, DocumentSimilarity
+from documents import text_clining, vector, fingerprints, shingle_index, deduplication, comparison_pool
 from documents.detectors import AdvancedPlagiarismDetector
 from documents.docx_extractor import extract_text_from_docx
 
@@ -33,43 +34,59 @@ def process_document_plagiarism(self, document_id):
         doc.processing_started_at = timezone.now()
         doc.save(update_fields=['processing_status', 'processing_started_at'])
         
-        # Шаг 1: Извлечение текста из PDF или DOCX
-        try:
-            file_path = doc.data.path if os.path.isabs(doc.data.path) else os.path.join("media", doc.data.path)
-            file_extension = os.path.splitext(file_path)[1].lower()
-            
-            # Определяем тип файла и извлекаем текст
-            if file_extension == '.pdf':
-                text_content = text_clining.clean_text_from_pdf(file_path)
-            elif file_extension == '.docx':
-                text_content = extract_text_from_docx(file_path)
-            else:
-                raise Exception(f"Неподдерживаемый формат файла: {file_extension}")
+        # Идентичный файл уже обработан: TXT, вектор и отпечатки переиспользуются без извлечения текста
+        duplicate = deduplication.find_processed_duplicate(doc)
+        if duplicate is not None and deduplication.reuse_processed_document(duplicate, doc):
+            if doc.on_defense:
+                shingle_index.index_document(doc)
+        else:
+            # Шаг 1: Извлечение текста из PDF или DOCX
+            try:
+                file_path = doc.data.path if os.path.isabs(doc.data.path) else os.path.join("media", doc.data.path)
+                file_extension = os.path.splitext(file_path)[1].lower()
             
-            txt_filename = f"{doc.name}.txt"
-            txt_file_path = os.path.join(settings.MEDIA_ROOT, "txt_files", txt_filename)
+                txt_filename = f"{doc.name}.txt"
+                txt_file_path = os.path.join(settings.MEDIA_ROOT, "txt_files", txt_filename)
             
-            # Создаём директорию если её нет
-            os.makedirs(os.path.dirname(txt_file_path), exist_ok=True)
+                # Создаём директорию если её нет
+                os.makedirs(os.path.dirname(txt_file_path), exist_ok=True)
             
-            with open(txt_file_path, "w", encoding='utf-8') as text_file:
-                text_file.write(text_content)
+                # Определяем тип файла и извлекаем текст
+                if file_extension == '.pdf':
+                    # Текст PDF пишется в файл по главам, не собираясь целиком в памяти
+                    text_clining.save_clean_text_from_pdf(file_path, txt_file_path)
+                elif file_extension == '.docx':
+                    with open(txt_file_path, "w", encoding='utf-8') as text_file:
+                        text_file.write(extract_text_from_docx(file_path))
+                else:
+                    raise Exception(f"Неподдерживаемый формат файла: {file_extension}")
                 
-            doc.txt_file = f"txt_files/{txt_filename}"
-            doc.save(update_fields=['txt_file'])
+                doc.txt_file = f"txt_files/{txt_filename}"
+                doc.save(update_fields=['txt_file'])
+                # Текст извлечён заново: сохранённые результаты сравнения с документом устарели
+                DocumentSimilarity.invalidate_document(doc)
             
-        except Exception as e:
-            raise Exception(f"Ошибка при извлечении текста из PDF: {str(e)}")
+                # Отпечатки шинглов считаются один раз при загрузке и переиспользуются при проверках
+                with open(txt_file_path, 'r', encoding='utf-8') as text_file:
+                    text_content = text_file.read()
+                fingerprints.save_fingerprints(doc.id, fingerprints.compute_fingerprints(text_content))
+                if doc.on_defense:
+                    shingle_index.index_document(doc)
+            
+            except Exception as e:
+                raise Exception(f"Ошибка при извлечении текста из PDF: {str(e)}")
         
-        # Шаг 2: Векторизация текста
-        try:
-            vector_array = vector.process_text(txt_file_path)
-            doc.set_vector_array(vector_array)
-            doc.save(update_fields=['vector'])
-        except Exception as e:
-            print(f"Предупреждение: Ошибка при создании вектора: {e}")
-            doc.vector = None
-            doc.save(update_fields=['vector'])
+            # Шаг 2: Векторизация текста
+            try:
+                vector_array = vector.process_text(txt_file_path)
+                doc.set_vector_array(vector_array)
+                doc.save(update_fields=['vector'])
+                DocumentVector.store_for_document(doc, vector_array)
+            except Exception as e:
+                print(f"Предупреждение: Ошибка при создании вектора: {e}")
+                doc.vector = None
+                doc.save(update_fields=['vector'])
+                DocumentVector.objects.filter(document=doc).delete()
         
         # Перезагружаем документ из БД чтобы обновить пути к файлам
         doc.refresh_from_db()
@@ -161,3 +178,39 @@ def batch_process_documents(document_ids):
             'task_id': task.id
         })
     return results
+
+
+@shared_task
+def compare_candidates_subtask(document, candidates, options):
+    """
+    Подзадача сравнения проверяемого документа с группой кандидатов (documents.comparison_pool)
+    
+    Args:
+        document: [ID, путь к TXT файлу] проверяемого документа
+        candidates: Список [ID, путь к TXT файлу] кандидатов
+        options: Параметры сравнения текстов
+        
+    Returns:
+        List с результатами сравнения в порядке кандидатов
+    """
+    return comparison_pool.compare_candidates_chunk(
+        comparison_pool.CandidateTask(*document),
+        [comparison_pool.CandidateTask(*candidate) for candidate in candidates],
+        options
+    )
+
+
+@shared_task
+def extract_pdf_pages_subtask(backend, pdf_path, start, stop):
+    """
+    Подзадача разбора диапазона страниц PDF (documents.text_clining.iter_pages_parallel)
+    
+    Args:
+        backend: Бэкенд извлечения текста ('pdfminer' или 'pymupdf')
+        pdf_path: Путь к PDF файлу
+        start, stop: Диапазон страниц [start, stop)
+        
+    Returns:
+        List с текстами страниц
+    """
+    return text_clining.extract_page_range(backend, pdf_path, start, stop)
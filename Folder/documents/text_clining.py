@@ -1,101 +1,586 @@
+import os
 import re
+import logging
+import tempfile
 from pdfminer.high_level import extract_pages
 from pdfminer.layout import LTTextContainer, LTRect, LTLine, LTCurve
 
-def clean_text_from_pdf(pdf_path):
+# Chapter name used for the text before the first heading
+DEFAULT_CHAPTER = "Бгиур"
+
+# Text held in memory while a table-of-contents match is still open; the rest spills to a temp file
+SPILL_MAX_SIZE = 1024 * 1024
+SPILL_CHUNK_SIZE = 64 * 1024
+
+# Minimum pages analysed by one subtask when a large PDF is split into page ranges
+PAGES_PER_TASK = 8
+
+logger = logging.getLogger(__name__)
+
+# pdfminer's LAParams.line_margin: lines closer than this share of their height form one text box
+LINE_MARGIN = 0.5
+
+
+# Precompiled cleaning patterns.
+#
+# The case-insensitive word patterns start with an explicit class of every case variant of
+# their first letter (including the ones re.IGNORECASE adds, e.g. U+1C84/U+1C85 for "т"):
+# re then jumps between candidate positions in C instead of trying a case-insensitive
+# alternation at every character. The rest of each word stays under (?i:...), and
+# look-behinds replace the leading \b and the choice between alternatives, so every
+# pattern matches exactly what the original re.IGNORECASE pattern matched.
+_TABLE_TEXT_RE = re.compile(r'\|.*\|$|\+[-+]+\+$|[-|+]+$')
+_PAGE_REFERENCE_END_RE = re.compile(r'\.\s*\d+\s*$')
+_CHAPTER_HEADING_RE = re.compile(r'\d+\s+[А-Я\s]+$|\d+\.\d+\s+[А-Я][а-я\s]+|[А-Я\s]+$')
+
+_PAGE_NUMBER_LINE_RE = re.compile(r'\n\s*\d+\s*\n')
+# (Рисунок|Таблица|рисунок\.|таблица\.)\s*\d+... to the end of the line
+_CAPTION_LINE_RE = re.compile(
+    r'[РрТтᲄᲅ](?:(?<=[Рр])(?i:исунок)|(?<=[Ттᲄᲅ])(?i:аблица))\.?\s*\d+(?:[–—\-]?\d+)*\s*[-–—]?\s*.*'
+)
+_PR_RE = re.compile(r'[Пп](?i:Р\s+[А-Я](?:\s+\([а-я]+\))?)')
+# \b(на рисунке|На рисунке|На рисунках)\b.*?[\n.]* — the lazy .*? always matches empty here
+_ON_FIGURE_RE = re.compile(r'[Нн](?<!\w[Нн])(?i:а рисунк(?:е|ах))\b[\n.]*')
+_TITLE_PAGE_RE = re.compile(r'[Мм](?i:инистерство образования Республики Беларусь.*?Минск\s*\d{4})')
+_FIGURE_REFERENCE_RE = re.compile(r'[Рр](?i:исунок\s*\d+[-–—]?\s*.*?[A-ZА-Я])')
+# \b(в таблице|на таблице|в таблицах|на таблицах)\b.*?[\n.]*
+_IN_TABLE_RE = re.compile(
+    r'[ВвᲀНн](?<!\w[ВвᲀНн])(?:(?<=[Ввᲀ])(?i: таблиц(?:е|ах))|(?<=[Нн])(?i:а таблиц(?:е|ах)))\b[\n.]*'
+)
+_TABLE_REFERENCE_RE = re.compile(r'[Ттᲄᲅ](?i:аблица\s*\d+[-–—]?\s*. *?[A-ZА-Я])')
+_EMPTY_BRACKETS_RE = re.compile(r'\[\s*\]')
+
+_TOC_ENTRY_RE = re.compile(r'\n\s*\d+\.\d+.*?\.{2,}\s*\d+\s*\n', re.DOTALL)
+_TOC_ENTRY_LINE_RE = re.compile(r'\n\s*\d+\.\d+.*?\.{2,}\s*\d+\s*\n')
+_BIBLIOGRAPHY_RE = re.compile(r'(\n\s*)(СПИСОК ИСПОЛЬЗОВАННЫХ ИСТОЧНИКОВ)(\s*\n.*?)(?=\Z)', re.IGNORECASE | re.DOTALL)
+_CONTENTS_RE = re.compile(r'\n\s*СОДЕРЖАНИЕ\s*\n.*?(?=\n\s*\d+\.\d+|\n\s*[А-Я]+\s*\n|\Z)', re.IGNORECASE | re.DOTALL)
+
+
+def is_table_text(text):
+    """Check if a (stripped) piece of text looks like a table row or border."""
+    return _TABLE_TEXT_RE.match(text) is not None
+
+
+def is_table_element(element):
+    """Check if an element is likely part of a table."""
+    if isinstance(element, (LTLine, LTRect, LTCurve)):
+        return True
+    if isinstance(element, LTTextContainer):
+        return is_table_text(element.get_text().strip())
+    return False
+
+
+def is_chapter_heading(text):
+    """Determine if the text is a chapter heading."""
+    if '..' in text or _PAGE_REFERENCE_END_RE.search(text):
+        return False
+    text = text.strip()
+    if len(text) <= 1:
+        return False
+    return _CHAPTER_HEADING_RE.match(text) is not None
+
+
+def clean_text(text):
+    """Clean the text by removing artifacts and unnecessary formatting."""
+    text = _PAGE_NUMBER_LINE_RE.sub('\n', text)
+    text = _CAPTION_LINE_RE.sub('', text)
+    text = _PR_RE.sub('', text)
+    text = _ON_FIGURE_RE.sub('', text)
+    # Same as re.sub(r'\s+', ' ', text): str.split() and \s use the same notion of whitespace.
+    # The leading/trailing space it would leave cannot take part in the matches below
+    # and is removed by the final strip()
+    text = ' '.join(text.split())
+    text = _TITLE_PAGE_RE.sub('', text)
+    text = _FIGURE_REFERENCE_RE.sub('', text)
+    text = _IN_TABLE_RE.sub('', text)
+    text = _TABLE_REFERENCE_RE.sub('', text)
+    text = _EMPTY_BRACKETS_RE.sub('', text)
+    return text.strip()
+
+
+def clean_applications(text):
+    """Remove the table of contents and everything from the bibliography on (whole-text reference)."""
+    text = _TOC_ENTRY_RE.sub('', text)
+    text = _BIBLIOGRAPHY_RE.sub('', text)
+    text = _CONTENTS_RE.sub('', text)
+    text = _TOC_ENTRY_LINE_RE.sub('', text)
+    return text
+
+
+# Streaming form of clean_applications.
+#
+# Every pattern of clean_applications starts at a newline, so a filter only has to hold back
+# the text after the last line break that may still turn into a match. The "held" alternative
+# of each scan pattern matches such an unfinished tail at the end of the buffer; it is deliberately
+# broader than the exact prefix of the pattern, which only makes the filter wait a little longer.
+_HELD_LINE = r'\n\s*[^\n]*\Z'
+
+_TOC_ENTRY_START = re.compile(r'(?P<start>\n\s*\d+\.\d)|' + _HELD_LINE)
+_TOC_ENTRY_END = re.compile(r'(?P<end>\.{2,}\s*\d+\s*\n)|\.[\s\d.]*\Z')
+_TOC_ENTRY_END_IN_LINE = re.compile(r'(?P<end>\.{2,}\s*\d+\s*\n)|(?P<newline>\n)|\.[\s\d.]*\Z')
+_BIBLIOGRAPHY_START = re.compile(r'(?P<start>\n\s*СПИСОК ИСПОЛЬЗОВАННЫХ ИСТОЧНИКОВ\s*\n)|' + _HELD_LINE, re.IGNORECASE)
+_CONTENTS_START = re.compile(r'(?P<start>\n\s*СОДЕРЖАНИЕ\s*\n)|' + _HELD_LINE, re.IGNORECASE)
+_CONTENTS_END = re.compile(r'(?P<end>\n\s*\d+\.\d|\n\s*[А-Я]+\s*\n)|' + _HELD_LINE, re.IGNORECASE)
+_TRAILING_SPACE = re.compile(r'\s*\Z')
+
+
+def _search(pattern, text, final, pos=0):
+    """Search that ignores the "held tail" alternative once the input is complete."""
+    match = pattern.search(text, pos)
+    while match and final and match.lastgroup is None:
+        match = pattern.search(text, match.start() + 1)
+    return match
+
+
+class _TocEntryFilter:
     """
-    Cleans text extracted from a PDF file by removing tables, artifacts, and unnecessary formatting.
+    Streaming `\\n\\s*\\d+\\.\\d+.*?\\.{2,}\\s*\\d+\\s*\\n` removal (a "1.1 Title ...... 5" line).
 
-    Args:
-        pdf_path (str): Path to the PDF file.
+    With DOTALL the lazy part may span the rest of the document while no page-number ending
+    has been seen yet; that text is kept in a spooled temporary file instead of memory.
+    """
 
-    Returns:
-        str: Cleaned text.
+    def __init__(self, dotall):
+        self.end_pattern = _TOC_ENTRY_END if dotall else _TOC_ENTRY_END_IN_LINE
+        self.spill = dotall
+        self.buffer = ''
+        self.pending = None
+        self.open = False
+        self.scan_from = 0
+
+    def feed(self, text, final=False):
+        self.buffer += text
+        output = []
+
+        while True:
+            if not self.open:
+                match = _search(_TOC_ENTRY_START, self.buffer, final)
+                if match is None:
+                    output.append(self.buffer)
+                    self.buffer = ''
+                    break
+                output.append(self.buffer[:match.start()])
+                self.buffer = self.buffer[match.start():]
+                if match.lastgroup is None:
+                    break
+                self.open = True
+                self.scan_from = match.end() - match.start()
+                continue
+
+            match = _search(self.end_pattern, self.buffer, final, self.scan_from)
+            if match is None or match.lastgroup is None:
+                held_from = len(self.buffer) if match is None else match.start()
+                if final:
+                    # No ending until the end of the text: nothing from this start is removed
+                    output.extend(self._release())
+                    output.append(self.buffer)
+                    self.buffer = ''
+                    self.open = False
+                    break
+                self._hold(held_from)
+                break
+
+            if match.lastgroup == 'newline':
+                # The entry must end on its own line; resume the search at the line break
+                output.extend(self._release())
+                output.append(self.buffer[:match.start()])
+                self.buffer = self.buffer[match.start():]
+                self.open = False
+                continue
+
+            if not final and _TRAILING_SPACE.match(self.buffer, match.end()):
+                # The trailing \s*\n may still grow with the next chunk
+                self._hold(match.start())
+                break
+
+            self._discard()
+            self.buffer = self.buffer[match.end():]
+            self.open = False
+
+        return output
+
+    def _hold(self, position):
+        """Move the scanned part of an open match out of the search buffer."""
+        if self.spill and position > self.scan_from:
+            if self.pending is None:
+                self.pending = tempfile.SpooledTemporaryFile(max_size=SPILL_MAX_SIZE, mode='w+', encoding='utf-8')
+            self.pending.write(self.buffer[:position])
+            self.buffer = self.buffer[position:]
+            self.scan_from = 0
+        else:
+            self.scan_from = max(self.scan_from, position)
+
+    def _release(self):
+        if self.pending is None:
+            return
+        self.pending.seek(0)
+        while True:
+            chunk = self.pending.read(SPILL_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+        self._discard()
+
+    def _discard(self):
+        if self.pending is not None:
+            self.pending.close()
+            self.pending = None
+
+
+class _SectionFilter:
     """
-    def is_table_element(element):
-        """Check if an element is likely part of a table."""
-        if isinstance(element, (LTLine, LTRect, LTCurve)):
-            return True
-        if isinstance(element, LTTextContainer):
-            text = element.get_text().strip()
-            if re.match(r'^\|.*\|$', text):
-                return True
-            if re.match(r'^\+[-+]+\+$', text):
-                return True
-            if re.match(r'^[-|+]+$', text):
-                return True
-        return False
+    Streaming removal of a section that starts with a heading line (`start`) and lasts
+    until `end` matches or, if `end` is None, until the end of the text.
+    """
+
+    def __init__(self, start, end=None):
+        self.start = start
+        self.end = end
+        self.buffer = ''
+        self.open = False
+
+    @property
+    def exhausted(self):
+        """Everything from now on is removed"""
+        return self.open and self.end is None
+
+    def feed(self, text, final=False):
+        self.buffer += text
+        output = []
+
+        while True:
+            if not self.open:
+                match = _search(self.start, self.buffer, final)
+                if match is None:
+                    output.append(self.buffer)
+                    self.buffer = ''
+                    break
+                output.append(self.buffer[:match.start()])
+                self.buffer = self.buffer[match.start():]
+                if match.lastgroup is None:
+                    break
+                if self.end is None:
+                    self.buffer = ''
+                    self.open = True
+                    break
+                heading_end = match.end() - match.start()
+                if not final and _TRAILING_SPACE.match(self.buffer, heading_end):
+                    # The heading's trailing \s*\n may still grow with the next chunk
+                    break
+                self.buffer = self.buffer[heading_end:]
+                self.open = True
+                continue
+
+            if self.end is None:
+                self.buffer = ''
+                break
+
+            match = _search(self.end, self.buffer, final)
+            if match is None:
+                self.buffer = ''
+                break
+            self.buffer = self.buffer[match.start():]
+            if match.lastgroup is None:
+                break
+            self.open = False
+
+        return output
 
-    def is_chapter_heading(text):
-        """Determine if the text is a chapter heading."""
-        if '..' in text or re.search(r'\s*\.\s*\d+\s*$', text):
-            return False
-        if len(text.strip()) <= 1:
-            return False
-        chapter_patterns = [
-            r'^\d+\s+[А-Я\s]+$',
-            r'^\d+\.\d+\s+[А-Я][а-я\s]+',
-            r'^[А-Я\s]+$'
+
+class ApplicationsFilter:
+    """
+    Incremental equivalent of clean_applications: text is fed in arbitrary chunks,
+    the concatenated output equals clean_applications of the concatenated input.
+    """
+
+    def __init__(self):
+        self.stages = [
+            _TocEntryFilter(dotall=True),
+            _SectionFilter(_BIBLIOGRAPHY_START),
+            _SectionFilter(_CONTENTS_START, _CONTENTS_END),
+            _TocEntryFilter(dotall=False)
         ]
-        return any(re.match(pattern, text.strip()) for pattern in chapter_patterns)
-
-    def clean_text(text):
-        """Clean the text by removing artifacts and unnecessary formatting."""
-        text = re.sub(r'\n\s*\d+\s*\n', '\n', text)
-        text = re.sub(r'(Рисунок|Таблица|рисунок\.|таблица\.)\s*\d+([–—\-]?\d+)*\s*[-–—]?\s*.*', '', text, flags=re.IGNORECASE)
-        text = re.sub(r'ПР\s+[А-Я](\s+\([а-я]+\))?', '', text, flags=re.IGNORECASE)
-        text = re.sub(r'\b(на рисунке|На рисунке|На рисунках)\b.*?[\n.]*', '', text, flags=re.IGNORECASE)
-        text = re.sub(r'\s+', ' ', text)
-        text = re.sub(r'Министерство образования Республики Беларусь.*?Минск\s*\d{4}', '', text, flags=re.IGNORECASE)
-        text = re.sub(r'Рисунок\s*\d+[-–—]?\s*.*?[A-ZА-Я]', '', text, flags=re.IGNORECASE)
-        text = re.sub(r'\b(в таблице|на таблице|в таблицах|на таблицах)\b.*?[\n.]*', '', text, flags=re.IGNORECASE)
-        text = re.sub(r'Таблица\s*\d+[-–—]?\s*. *?[A-ZА-Я]', '', text, flags=re.IGNORECASE)
-        text = re.sub(r'\[\s*\]', '', text)
-        return text.strip()
-    
-    def clean_applications(text):
-        text = re.sub(r'\n\s*\d+\.\d+.*?\.{2,}\s*\d+\s*\n', '', text, flags=re.DOTALL)
-        text = re.sub(r'(\n\s*)(СПИСОК ИСПОЛЬЗОВАННЫХ ИСТОЧНИКОВ)(\s*\n.*?)(?=\Z)', '', text, flags=re.IGNORECASE | re.DOTALL)
-        text = re.sub(r'\n\s*СОДЕРЖАНИЕ\s*\n.*?(?=\n\s*\d+\.\d+|\n\s*[А-Я]+\s*\n|\Z)'   , '', text, flags=re.IGNORECASE | re.DOTALL)
-        text = re.sub(r'\n\s*\d+\.\d+.*?\.{2,}\s*\d+\s*\n', '', text)
-        return text
-
-    chapters_content = []
-    current_chapter = "Бгиур"
-    current_content = []
 
-    for page_layout in extract_pages(pdf_path):
+    @property
+    def exhausted(self):
+        """The bibliography has started: the rest of the input cannot reach the output"""
+        return self.stages[1].exhausted
+
+    def feed(self, text, final=False):
+        chunks = [text]
+        for stage in self.stages:
+            chunks = [piece for chunk in chunks for piece in stage.feed(chunk) if piece]
+            if final:
+                chunks.extend(piece for piece in stage.feed('', final=True) if piece)
+        return chunks
+
+    def close(self):
+        return self.feed('', final=True)
+
+
+def is_skipped_page(first_text):
+    """Title and table of contents pages are not part of the document text."""
+    return first_text.upper().startswith('СОДЕРЖАНИЕ') or first_text.upper().startswith('МИНИСТЕРСТВО ОБРАЗОВАНИЯ')
+
+
+def iter_pdf_pages(pdf_path, page_numbers=None):
+    """
+    Yield the non-table text elements of every page (pdfminer layout analysis).
+    page_numbers (zero-based) limits the analysis to those pages.
+    """
+    for page_layout in extract_pages(pdf_path, page_numbers=page_numbers):
         first_text = ''
         for element in page_layout:
             if isinstance(element, LTTextContainer):
                 first_text = element.get_text().strip()
-                break 
+                break
 
-        if first_text.upper().startswith('СОДЕРЖАНИЕ') or first_text.upper().startswith('МИНИСТЕРСТВО ОБРАЗОВАНИЯ'):
+        if is_skipped_page(first_text):
             continue
 
+        texts = []
         for element in page_layout:
             if isinstance(element, LTTextContainer) and not is_table_element(element):
                 text = element.get_text()
                 if text:
-                    if is_chapter_heading(text):
-                        if current_chapter and current_content:
-                            chapters_content.append({
-                                'chapter': current_chapter,
-                                'content': clean_text(' '.join(current_content))
-                            })
-                            current_content = []
-                        current_chapter = text
-                    else:
-                        current_content.append(text)
+                    texts.append(text)
+        yield texts
+
+
+def _is_same_box(previous, line):
+    """pdfminer's neighbour test for two consecutive lines (same height, aligned, vertically close)."""
+    x0, y0, x1, y1 = previous['bbox']
+    u0, v0, u1, v1 = line['bbox']
+    height = y1 - y0
+    margin = LINE_MARGIN * height
+    aligned = abs(x0 - u0) <= margin or abs(x1 - u1) <= margin or abs((x0 + x1) - (u0 + u1)) / 2 <= margin
+    return abs(height - (v1 - v0)) <= margin and aligned and v0 - y1 <= margin
+
+
+def _line_text(line):
+    return ''.join(span['text'] for span in line['spans'])
+
+
+def iter_text_boxes(block):
+    """
+    Split a PyMuPDF text block into pdfminer-like text boxes: PyMuPDF keeps a paragraph and
+    the heading above it (with blank lines between them) in one block, pdfminer does not.
+    """
+    box = []
+    previous = None
+    for line in block['lines']:
+        text = _line_text(line)
+        if not text.strip():
+            # Whitespace-only lines are not part of any pdfminer text box and separate boxes
+            if box:
+                yield box
+            box, previous = [], None
+            continue
+        if previous is not None and not _is_same_box(previous, line):
+            yield box
+            box = []
+        box.append(text)
+        previous = line
+    if box:
+        yield box
+
+
+def is_table_block(lines):
+    """
+    Table detection on PyMuPDF line data: a box is a table if its text looks like a table
+    row or border as a whole (as with pdfminer text boxes) or line by line.
+    """
+    if is_table_text(''.join(f'{line}\n' for line in lines).strip()):
+        return True
+    stripped = [line.strip() for line in lines if line.strip()]
+    return bool(stripped) and all(is_table_text(line) for line in stripped)
+
+
+def _import_pymupdf():
+    try:
+        import pymupdf
+    except ImportError:
+        import fitz as pymupdf
+    return pymupdf
+
+
+def iter_pymupdf_pages(pdf_path, page_numbers=None):
+    """Yield the non-table text boxes of every page (PyMuPDF), in the format of iter_pdf_pages."""
+    pymupdf = _import_pymupdf()
+
+    with pymupdf.open(pdf_path) as document:
+        for page_number in (range(len(document)) if page_numbers is None else page_numbers):
+            page = document[page_number]
+            # Text blocks only (type 0); a box's text is its lines with a line break each, as in pdfminer
+            boxes = [
+                box
+                for block in page.get_text('dict', sort=True)['blocks'] if block['type'] == 0
+                for box in iter_text_boxes(block)
+            ]
+            first_text = ''.join(f'{line}\n' for line in boxes[0]).strip() if boxes else ''
+
+            if is_skipped_page(first_text):
+                continue
+
+            yield [''.join(f'{line}\n' for line in lines) for lines in boxes if not is_table_block(lines)]
+
+
+PDF_BACKENDS = {
+    'pdfminer': iter_pdf_pages,
+    'pymupdf': iter_pymupdf_pages,
+}
+
+
+def get_pdf_backend():
+    """PDF extraction backend from the PDF_EXTRACTION_BACKEND setting."""
+    from django.conf import settings
+
+    backend = getattr(settings, 'PDF_EXTRACTION_BACKEND', 'pdfminer')
+    if backend not in PDF_BACKENDS:
+        raise ValueError(f"Unknown PDF extraction backend: {backend}")
+    return backend
+
+
+def count_pdf_pages(pdf_path):
+    """Number of pages without layout analysis."""
+    try:
+        with _import_pymupdf().open(pdf_path) as document:
+            return len(document)
+    except ImportError:
+        from pdfminer.pdfpage import PDFPage
+
+        with open(pdf_path, 'rb') as pdf_file:
+            return sum(1 for _ in PDFPage.get_pages(pdf_file))
+
+
+def get_extraction_workers():
+    """Number of page analysis subtasks per PDF_EXTRACTION_WORKERS (1 means sequential)."""
+    from django.conf import settings
+
+    return max(getattr(settings, 'PDF_EXTRACTION_WORKERS', 1), 1)
+
+
+def extract_page_range(backend, pdf_path, start, stop):
+    """Page texts of pages [start, stop) as a list (the result of a page analysis subtask)."""
+    return list(PDF_BACKENDS[backend](pdf_path, range(start, stop)))
+
+
+def iter_pages_parallel(pdf_path, backend, page_count, workers):
+    """
+    Analyse contiguous page ranges of a PDF in Celery subtasks (see documents.task_fanout)
+    and yield the pages in document order.
+
+    Only a failure to dispatch the subtasks falls back to sequential analysis; an error
+    raised while analysing a page range (e.g. a broken PDF) propagates.
+    """
+    from documents.task_fanout import dispatch_group, iter_group_results
+    from documents.tasks import extract_pdf_pages_subtask
+
+    size = max(PAGES_PER_TASK, -(-page_count // workers))
+    group_result = dispatch_group(
+        extract_pdf_pages_subtask.s(backend, pdf_path, start, min(start + size, page_count))
+        for start in range(0, page_count, size)
+    )
+    if group_result is None:
+        yield from PDF_BACKENDS[backend](pdf_path)
+        return
+
+    for pages in iter_group_results(group_result):
+        yield from pages
+
+
+def iter_pages(pdf_path, backend):
+    """
+    Page texts of a PDF: with PDF_EXTRACTION_WORKERS > 1, PDFs with at least
+    PDF_PARALLEL_MIN_PAGES pages are analysed in subtasks, others sequentially.
+    """
+    from django.conf import settings
+
+    workers = get_extraction_workers()
+    min_pages = getattr(settings, 'PDF_PARALLEL_MIN_PAGES', 0)
+    if workers > 1 and min_pages > 0:
+        page_count = count_pdf_pages(pdf_path)
+        if page_count >= min_pages:
+            return iter_pages_parallel(pdf_path, backend, page_count, workers)
+    return PDF_BACKENDS[backend](pdf_path)
+
+
+def iter_chapters(pages):
+    """Group page texts into (chapter heading, cleaned content) pairs as soon as each chapter ends."""
+    current_chapter = DEFAULT_CHAPTER
+    current_content = []
+
+    for texts in pages:
+        for text in texts:
+            if is_chapter_heading(text):
+                if current_chapter and current_content:
+                    yield current_chapter, clean_text(' '.join(current_content))
+                    current_content = []
+                current_chapter = text
+            else:
+                current_content.append(text)
 
     if current_content:
-        chapters_content.append({
-            'chapter': current_chapter,
-            'content': clean_text(' '.join(current_content))
-        })
+        yield current_chapter, clean_text(' '.join(current_content))
+
+
+def iter_document_text(chapters):
+    """Join (heading, content) chapters into the document text and stream it through ApplicationsFilter."""
+    applications = ApplicationsFilter()
+    separator = ''
+
+    for chapter, content in chapters:
+        yield from applications.feed(f"{separator}{chapter}\n{content}")
+        separator = '\n\n'
+        if applications.exhausted:
+            # Only the bibliography and appendices are left: no need to parse the remaining pages
+            break
+
+    yield from applications.close()
 
-    # Combine all content into a single string
-    full_cleaned_text = clean_applications('\n\n'.join(f"{chapter['chapter']}\n{chapter['content']}" for chapter in chapters_content))
-    return full_cleaned_text
 
+def iter_clean_text(pdf_path, backend=None):
+    """
+    Stream the cleaned text of a PDF file chapter by chapter.
+
+    Args:
+        pdf_path (str): Path to the PDF file.
+        backend (str): 'pdfminer' or 'pymupdf'; defaults to the PDF_EXTRACTION_BACKEND setting.
+
+    Yields:
+        str: Consecutive pieces of the cleaned text.
+    """
+    # Pages always arrive in document order, so the chapter state machine below
+    # runs over the same sequence whether they were analysed sequentially or in subtasks
+    pages = iter_pages(pdf_path, backend or get_pdf_backend())
+    yield from iter_document_text(iter_chapters(pages))
+
+
+def clean_text_from_pdf(pdf_path, backend=None):
+    """
+    Cleans text extracted from a PDF file by removing tables, artifacts, and unnecessary formatting.
+
+    Args:
+        pdf_path (str): Path to the PDF file.
+        backend (str): Extraction backend, see iter_clean_text.
+
+    Returns:
+        str: Cleaned text.
+    """
+    return ''.join(iter_clean_text(pdf_path, backend))
+
+
+def save_clean_text_from_pdf(pdf_path, txt_path, backend=None):
+    """
+    Write the cleaned text of a PDF file to txt_path piece by piece.
+    The file is replaced only after the whole document has been processed.
+    """
+    tmp_path = f'{txt_path}.{os.getpid()}.tmp'
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as text_file:
+            for piece in iter_clean_text(pdf_path, backend):
+                text_file.write(piece)
+        os.replace(tmp_path, txt_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
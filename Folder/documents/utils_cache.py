@@ -1,10 +1,17 @@
 """
-Утилиты для кэширования векторов и результатов в Redis
+Утилиты для кэширования векторов и результатов: двухуровневый кэш —
+LRU в памяти процесса (ограничен по объёму, с TTL) перед общим кэшем в Redis.
+
+Локальный уровень не видит инвалидаций из других процессов, поэтому время жизни
+записей в нём ограничено CACHE_LOCAL_TTL.
 """
 
-import os
-import json
+import sys
+import time
+import struct
 import redis
+import threading
+from collections import OrderedDict
 from django.conf import settings
 from typing import Optional
 import numpy as np
@@ -12,49 +19,202 @@ import logging
 
 logger = logging.getLogger(__name__)
 
-# Подключение к Redis с проверкой доступности
+# Значения по умолчанию для настроек CACHE_LOCAL_MAX_BYTES, CACHE_LOCAL_TTL, REDIS_RETRY_INTERVAL
+DEFAULT_LOCAL_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_LOCAL_TTL = 300
+DEFAULT_REDIS_RETRY_INTERVAL = 30
+
+# Формат вектора в Redis: заголовок (версия формата, код типа) + сырые байты little-endian float32
+VECTOR_FORMAT_VERSION = 1
+VECTOR_HEADER = struct.Struct('<BB')
+VECTOR_DTYPES = {1: np.dtype('<f4')}
+VECTOR_DTYPE_CODES = {dtype: code for code, dtype in VECTOR_DTYPES.items()}
+VECTOR_CACHE_DTYPE = np.dtype('<f4')
+
+# Значения по умолчанию для настроек подключения к Redis кэша (адрес — CACHE_REDIS_URL в settings)
+DEFAULT_MAX_CONNECTIONS = 20
+DEFAULT_POOL_TIMEOUT = 1
+DEFAULT_HEALTH_CHECK_INTERVAL = 30
+# Ошибка BlockingConnectionPool, если свободное соединение не появилось за CACHE_REDIS_POOL_TIMEOUT
+POOL_EXHAUSTED_MESSAGE = 'No connection available.'
+
+# Пул соединений и клиент Redis с проверкой доступности
+redis_pool = None
+redis_pool_lock = threading.Lock()
 redis_client = None
 redis_available = None
+# Момент (time.monotonic), после которого недоступный Redis проверяется снова
+redis_retry_at = 0.0
+
+
+class LocalCache:
+    """
+    LRU-кэш в памяти процесса с ограничением суммарного объёма значений и TTL записей.
+    Потокобезопасен (gunicorn с потоками, поток пула Celery).
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()  # ключ -> (значение, объём, момент истечения)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[2] <= time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key: str, value, ttl: float):
+        size = _value_size(value)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if size > self.max_bytes or ttl <= 0:
+                return
+            self._entries[key] = (value, size, time.monotonic() + ttl)
+            self.size += size
+            while self.size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def delete(self, key: str):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def _remove(self, key: str):
+        self.size -= self._entries.pop(key)[1]
+
+
+def _value_size(value) -> int:
+    if isinstance(value, np.ndarray):
+        # getsizeof учитывает данные только у массива, владеющего ими (не у представления)
+        return max(sys.getsizeof(value), value.nbytes)
+    return sys.getsizeof(value)
+
+
+local_cache = LocalCache(int(getattr(settings, 'CACHE_LOCAL_MAX_BYTES', DEFAULT_LOCAL_MAX_BYTES)))
+
+
+def _local_ttl(ttl: Optional[int] = None) -> float:
+    """Время жизни записи в локальном кэше: не дольше CACHE_LOCAL_TTL и TTL записи в Redis"""
+    local_ttl = getattr(settings, 'CACHE_LOCAL_TTL', DEFAULT_LOCAL_TTL)
+    return local_ttl if ttl is None else min(ttl, local_ttl)
+
+
+def get_redis_pool() -> redis.BlockingConnectionPool:
+    """
+    Общий для потоков процесса пул соединений с Redis кэша (CACHE_REDIS_URL, отдельно от брокера Celery).
+    Поддерживаются адреса redis://, rediss:// (TLS) и unix:// с паролем и номером базы.
+    При занятых соединениях поток ждёт освободившееся не дольше CACHE_REDIS_POOL_TIMEOUT,
+    а не открывает соединения сверх CACHE_REDIS_MAX_CONNECTIONS.
+    После fork пул сам пересоздаёт соединения в дочернем процессе.
+    """
+    global redis_pool
+
+    with redis_pool_lock:
+        if redis_pool is None:
+            redis_pool = redis.BlockingConnectionPool.from_url(
+                settings.CACHE_REDIS_URL,
+                max_connections=getattr(settings, 'CACHE_REDIS_MAX_CONNECTIONS', DEFAULT_MAX_CONNECTIONS),
+                timeout=getattr(settings, 'CACHE_REDIS_POOL_TIMEOUT', DEFAULT_POOL_TIMEOUT),
+                health_check_interval=getattr(settings, 'CACHE_REDIS_HEALTH_CHECK_INTERVAL', DEFAULT_HEALTH_CHECK_INTERVAL),
+                socket_connect_timeout=1,
+                socket_timeout=1
+            )
+        return redis_pool
+
 
 def get_redis_client():
-    """Получить Redis клиент с проверкой доступности (один раз)"""
+    """
+    Получить Redis клиент с проверкой доступности.
+    Если Redis недоступен, повторная попытка подключения — не раньше чем через REDIS_RETRY_INTERVAL секунд.
+    """
     global redis_client, redis_available
     
-    if redis_available is False:
+    if redis_available is False and time.monotonic() < redis_retry_at:
         return None
     
     if redis_client is None:
         try:
-            # Парсим CELERY_BROKER_URL или используем defaults
-            broker_url = os.getenv('CELERY_BROKER_URL', 'redis://localhost:6379/0')
-            # Простой парсинг redis://host:port/db
-            import re
-            match = re.match(r'redis://([^:]+):(\d+)/(\d+)', broker_url)
-            if match:
-                host, port, db = match.groups()
-            else:
-                host, port, db = 'localhost', '6379', '0'
-            
-            redis_client = redis.Redis(
-                host=host,
-                port=int(port),
-                db=int(db),
-                decode_responses=False,
-                socket_connect_timeout=1,
-                socket_timeout=1
-            )
+            client = redis.Redis(connection_pool=get_redis_pool())
             # Проверяем подключение
-            redis_client.ping()
+            client.ping()
+            redis_client = client
             redis_available = True
             logger.info("Redis подключен успешно")
         except Exception as e:
-            redis_available = False
-            redis_client = None
-            logger.warning(f"Redis недоступен, кэширование отключено: {e}")
+            mark_redis_unavailable(e)
     
     return redis_client
 
 
+def mark_redis_unavailable(error: Exception):
+    """Отключает Redis до следующей попытки подключения; локальный уровень кэша продолжает работать"""
+    global redis_client, redis_available, redis_retry_at
+
+    retry_interval = getattr(settings, 'REDIS_RETRY_INTERVAL', DEFAULT_REDIS_RETRY_INTERVAL)
+    if redis_available is not False:
+        logger.warning(f"Redis недоступен, общий кэш отключён на {retry_interval} с: {error}")
+    redis_available = False
+    redis_client = None
+    redis_retry_at = time.monotonic() + retry_interval
+    
+
+def _handle_redis_error(error: Exception):
+    # Ошибки соединения отключают Redis, чтобы не ждать таймаут сокета на каждой операции;
+    # занятый пул соединений — не признак недоступности сервера
+    if isinstance(error, (redis.ConnectionError, redis.TimeoutError)) and str(error) != POOL_EXHAUSTED_MESSAGE:
+        mark_redis_unavailable(error)
+
+
+def _vector_key(document_id: int) -> str:
+    return f'vector:{document_id}'
+
+
+def _similarity_key(doc1_id: int, doc2_id: int) -> str:
+    return f'similarity:{min(doc1_id, doc2_id)}:{max(doc1_id, doc2_id)}'
+
+
+def _readonly_vector(vector) -> np.ndarray:
+    # Один и тот же массив из локального кэша отдаётся разным вызывающим
+    vector = np.array(vector, dtype=VECTOR_CACHE_DTYPE)
+    vector.setflags(write=False)
+    return vector
+
+
+def encode_vector(vector) -> bytes:
+    """Кодирует вектор для кэша: заголовок и сырые байты float32"""
+    header = VECTOR_HEADER.pack(VECTOR_FORMAT_VERSION, VECTOR_DTYPE_CODES[VECTOR_CACHE_DTYPE])
+    return header + np.ascontiguousarray(vector, dtype=VECTOR_CACHE_DTYPE).tobytes()
+
+
+def decode_vector(value: bytes) -> np.ndarray:
+    """
+    Декодирует вектор из кэша без копирования (массив только для чтения).
+    Значения другого формата (например, JSON прежних версий) вызывают ValueError.
+    """
+    if len(value) < VECTOR_HEADER.size:
+        raise ValueError('Значение кэша короче заголовка вектора')
+    version, dtype_code = VECTOR_HEADER.unpack_from(value)
+    if version != VECTOR_FORMAT_VERSION or dtype_code not in VECTOR_DTYPES:
+        raise ValueError(f'Неизвестный формат вектора в кэше: версия {version}, тип {dtype_code}')
+    return np.frombuffer(value, dtype=VECTOR_DTYPES[dtype_code], offset=VECTOR_HEADER.size)
+
+
 def get_cached_vector(document_id: int) -> Optional[np.ndarray]:
     """
     Получить вектор документа из кэша
@@ -63,23 +223,29 @@ def get_cached_vector(document_id: int) -> Optional[np.ndarray]:
         document_id: ID документа
         
     Returns:
-        numpy array или None
+        numpy array (только для чтения) или None
     """
+    key = _vector_key(document_id)
+    vector = local_cache.get(key)
+    if vector is not None:
+        return vector
+
     client = get_redis_client()
     if not client:
         return None
     
     try:
-        key = f'vector:{document_id}'
         cached = client.get(key)
         
         if cached:
-            vector_data = json.loads(cached)
-            return np.array(vector_data)
+            vector = decode_vector(cached)
+            local_cache.set(key, vector, _local_ttl())
+            return vector
         
         return None
         
-    except Exception:
+    except Exception as e:
+        _handle_redis_error(e)
         return None
 
 
@@ -92,16 +258,17 @@ def cache_vector(document_id: int, vector: np.ndarray, ttl: int = 3600):
         vector: numpy array вектора
         ttl: время жизни в секундах (по умолчанию 1 час)
     """
+    key = _vector_key(document_id)
+    local_cache.set(key, _readonly_vector(vector), _local_ttl(ttl))
+
     client = get_redis_client()
     if not client:
         return
     
     try:
-        key = f'vector:{document_id}'
-        vector_json = json.dumps(vector.tolist())
-        client.setex(key, ttl, vector_json)
-    except Exception:
-        pass
+        client.setex(key, ttl, encode_vector(vector))
+    except Exception as e:
+        _handle_redis_error(e)
 
 
 def invalidate_vector_cache(document_id: int):
@@ -111,15 +278,17 @@ def invalidate_vector_cache(document_id: int):
     Args:
         document_id: ID документа
     """
+    key = _vector_key(document_id)
+    local_cache.delete(key)
+
     client = get_redis_client()
     if not client:
         return
     
     try:
-        key = f'vector:{document_id}'
         client.delete(key)
-    except Exception:
-        pass
+    except Exception as e:
+        _handle_redis_error(e)
 
 
 def cache_similarity_result(doc1_id: int, doc2_id: int, similarity: float, ttl: int = 7200):
@@ -131,15 +300,17 @@ def cache_similarity_result(doc1_id: int, doc2_id: int, similarity: float, ttl:
         similarity: значение схожести
         ttl: время жизни (по умолчанию 2 часа)
     """
+    key = _similarity_key(doc1_id, doc2_id)
+    local_cache.set(key, float(similarity), _local_ttl(ttl))
+
     client = get_redis_client()
     if not client:
         return
     
     try:
-        key = f'similarity:{min(doc1_id, doc2_id)}:{max(doc1_id, doc2_id)}'
         client.setex(key, ttl, str(similarity))
-    except Exception:
-        pass
+    except Exception as e:
+        _handle_redis_error(e)
 
 
 def get_cached_similarity(doc1_id: int, doc2_id: int) -> Optional[float]:
@@ -152,17 +323,24 @@ def get_cached_similarity(doc1_id: int, doc2_id: int) -> Optional[float]:
     Returns:
         float значение схожести или None
     """
+    key = _similarity_key(doc1_id, doc2_id)
+    similarity = local_cache.get(key)
+    if similarity is not None:
+        return similarity
+
     client = get_redis_client()
     if not client:
         return None
     
     try:
-        key = f'similarity:{min(doc1_id, doc2_id)}:{max(doc1_id, doc2_id)}'
         cached = client.get(key)
         
         if cached:
-            return float(cached)
+            similarity = float(cached)
+            local_cache.set(key, similarity, _local_ttl())
+            return similarity
         
         return None
-    except Exception:
+    except Exception as e:
+        _handle_redis_error(e)
         return None
@@ -1,49 +1,111 @@
 import re
 import numpy as np
 import os
+import time
 import logging
 
+from django.conf import settings
+
 logger = logging.getLogger(__name__)
 
 # Глобальная переменная для хранения модели (ленивая загрузка)
 _model = None
 MODEL_NAME = 'paraphrase-MiniLM-L6-v2'
+# Размер пакета предложений для одного прохода модели
+DEFAULT_EMBEDDING_BATCH_SIZE = 64
+# После ошибки сервера векторизации следующая попытка — не раньше чем через столько секунд
+EMBEDDING_SERVER_RETRY_INTERVAL = 30
+_embedding_server_retry_at = 0.0
+
+
+def get_hf_home():
+    """Каталог кеша HuggingFace из переменных окружения (в Docker — volume hf_cache)"""
+    return os.environ.get('HF_HOME', os.environ.get('TRANSFORMERS_CACHE', '/root/.cache/huggingface'))
+
+
+def get_embedding_backend():
+    """Бэкенд векторизации согласно EMBEDDING_BACKEND: 'torch', 'onnx' или 'onnx-int8'"""
+    return getattr(settings, 'EMBEDDING_BACKEND', 'torch')
 
 
 def get_model():
     """
-    Получает модель SentenceTransformer с ленивой загрузкой.
+    Получает модель векторизации с ленивой загрузкой.
     Загружает модель только при первом вызове.
-    Использует кеш HuggingFace из переменных окружения или volume в Docker.
+    Бэкенд выбирается настройкой EMBEDDING_BACKEND; если ONNX-бэкенд не загрузился,
+    в лог пишется ошибка и используется PyTorch SentenceTransformer.
     """
     global _model
     
     if _model is None:
-        try:
-            # Устанавливаем пути к кешу HuggingFace из переменных окружения
-            # В Docker это будет /root/.cache/huggingface (настроено через volume hf_cache)
-            hf_home = os.environ.get('HF_HOME', os.environ.get('TRANSFORMERS_CACHE', '/root/.cache/huggingface'))
-            cache_dir = os.path.join(hf_home, 'hub')
-            os.makedirs(cache_dir, exist_ok=True)
-            
-            logger.info(f"Загрузка модели {MODEL_NAME} из кеша {hf_home}...")
-            from sentence_transformers import SentenceTransformer
-            # Модель автоматически использует кеш из переменных окружения
-            _model = SentenceTransformer(MODEL_NAME, cache_folder=hf_home)
-            logger.info(f"Модель {MODEL_NAME} успешно загружена (размер: ~80MB)")
-        except Exception as e:
-            error_msg = str(e)
-            logger.error(f"Ошибка при загрузке модели {MODEL_NAME}: {error_msg}")
-            
-            # Предупреждение, если модель не найдена в кеше
-            if "not found" in error_msg.lower() or "404" in error_msg:
-                logger.warning(f"Модель {MODEL_NAME} не найдена в кеше. При первом запуске она будет скачана из интернета.")
-            
-            raise RuntimeError(f"Не удалось загрузить модель векторизации {MODEL_NAME}: {error_msg}")
+        backend = get_embedding_backend()
+        if backend in ('onnx', 'onnx-int8'):
+            try:
+                _model = load_onnx_model(quantized=backend == 'onnx-int8')
+            except ImportError as e:
+                logger.error(
+                    f"Бэкенд векторизации {backend} не загружен ({e}): проверьте установку onnxruntime и onnx; "
+                    f"используется PyTorch-бэкенд"
+                )
+        
+        if _model is None:
+            _model = load_torch_model()
     
     return _model
 
 
+def load_torch_model():
+    """
+    Загружает модель SentenceTransformer (PyTorch).
+    Использует кеш HuggingFace из переменных окружения или volume в Docker.
+    """
+    try:
+        # Устанавливаем пути к кешу HuggingFace из переменных окружения
+        # В Docker это будет /root/.cache/huggingface (настроено через volume hf_cache)
+        hf_home = get_hf_home()
+        cache_dir = os.path.join(hf_home, 'hub')
+        os.makedirs(cache_dir, exist_ok=True)
+        
+        logger.info(f"Загрузка модели {MODEL_NAME} из кеша {hf_home}...")
+        from sentence_transformers import SentenceTransformer
+        # Модель автоматически использует кеш из переменных окружения
+        model = SentenceTransformer(MODEL_NAME, cache_folder=hf_home)
+        logger.info(f"Модель {MODEL_NAME} успешно загружена (размер: ~80MB)")
+        return model
+    except Exception as e:
+        error_msg = str(e)
+        logger.error(f"Ошибка при загрузке модели {MODEL_NAME}: {error_msg}")
+        
+        # Предупреждение, если модель не найдена в кеше
+        if "not found" in error_msg.lower() or "404" in error_msg:
+            logger.warning(f"Модель {MODEL_NAME} не найдена в кеше. При первом запуске она будет скачана из интернета.")
+        
+        raise RuntimeError(f"Не удалось загрузить модель векторизации {MODEL_NAME}: {error_msg}")
+
+
+def load_onnx_model(quantized=False):
+    """
+    Загружает модель на ONNX Runtime. При первом запуске модель экспортируется
+    из PyTorch SentenceTransformer (и квантизуется в int8, если quantized=True).
+    """
+    import onnxruntime  # Проверяем наличие зависимости до экспорта
+    from documents import embedding_onnx
+
+    onnx_dir = embedding_onnx.get_onnx_dir(get_hf_home(), MODEL_NAME)
+    model_file = embedding_onnx.ONNX_INT8_MODEL_FILE if quantized else embedding_onnx.ONNX_MODEL_FILE
+    model_path = os.path.join(onnx_dir, model_file)
+
+    if not os.path.exists(model_path):
+        if quantized:
+            import onnx  # quantize_dynamic требует пакет onnx, проверяем до экспорта
+        logger.info(f"ONNX-модель {model_path} не найдена, выполняется экспорт...")
+        model_path = embedding_onnx.export_onnx_model(load_torch_model(), onnx_dir, quantized=quantized)
+
+    model = embedding_onnx.OnnxSentenceEncoder(model_path, onnx_dir, threads=getattr(settings, 'EMBEDDING_THREADS', 0))
+    logger.info(f"Модель {MODEL_NAME} загружена в ONNX Runtime ({model_file})")
+    return model
+
+
 def extract_chapters_from_txt(txt_filename):
     """
     Извлекает главы из текста в txt файле, разделяя по пустой строке.
@@ -79,15 +141,50 @@ def split_text_to_sentences(block):
 
     return sentences
 
+def get_embedding_batch_size():
+    return getattr(settings, 'EMBEDDING_BATCH_SIZE', DEFAULT_EMBEDDING_BATCH_SIZE)
+
+
+def encode_sentences(sentences, batch_size=None):
+    """
+    Векторизует предложения пакетами. Возвращает матрицу (число предложений, размерность)
+    в порядке входного списка.
+    Если задан EMBEDDING_SERVER_URL, векторизация выполняется сервером векторизации,
+    а модель загружается в процесс только когда сервер недоступен.
+    """
+    global _embedding_server_retry_at
+
+    server_url = getattr(settings, 'EMBEDDING_SERVER_URL', '')
+    if server_url and time.monotonic() >= _embedding_server_retry_at:
+        from documents.embedding_server import request_embeddings
+        try:
+            return request_embeddings(server_url, sentences, timeout=getattr(settings, 'EMBEDDING_SERVER_TIMEOUT', 300))
+        except (OSError, ValueError) as e:
+            _embedding_server_retry_at = time.monotonic() + EMBEDDING_SERVER_RETRY_INTERVAL
+            logger.warning(f"Сервер векторизации {server_url} недоступен ({e}), используется локальная модель")
+
+    model = get_model()
+    # encode сам упорядочивает предложения по длине внутри вызова, поэтому в пакет
+    # попадают предложения близкой длины и паддинг минимален; порядок результата сохраняется
+    return model.encode(
+        sentences,
+        batch_size=batch_size or get_embedding_batch_size(),
+        convert_to_numpy=True,
+        show_progress_bar=False
+    )
+
+
 def process_text(txt_filename):
     """
     Генерирует вектор документа, усредняя векторы предложений и блоков.
+    Все предложения документа векторизуются одним пакетным вызовом модели.
     """
     # Разделяем текст на главы
     chapters = extract_chapters_from_txt(txt_filename)
 
-    # Генерация векторов для каждого блока
-    all_chapter_vectors = []
+    # Собираем предложения всех глав подряд, запоминая границы глав
+    all_sentences = []
+    chapter_bounds = []
     for chapter_title, chapter_content in chapters.items():
 
         sentences = split_text_to_sentences(chapter_content + chapter_title)
@@ -96,27 +193,25 @@ def process_text(txt_filename):
         sentences = [sentence.strip() for sentence in sentences if sentence.strip()]
 
         if sentences:  # Только если есть предложения
-            try:
-                # Получаем модель (ленивая загрузка)
-                model = get_model()
-                # Генерация векторов для каждого предложения
-                sentence_vectors = [model.encode(sentence) for sentence in sentences]
-
-                chapter_vector = np.mean(sentence_vectors, axis=0)
-                all_chapter_vectors.append(chapter_vector)
-            except Exception as e:
-                logger.error(f"Ошибка при векторизации предложений: {e}")
-                # Продолжаем обработку, даже если векторизация не удалась
-                # Это позволит обработать остальные главы
-                pass
+            chapter_bounds.append((len(all_sentences), len(all_sentences) + len(sentences)))
+            all_sentences.extend(sentences)
 
-    # Усредняем векторы для всех глав, чтобы получить финальный вектор документа
-    if all_chapter_vectors:
-        document_vector = np.mean(all_chapter_vectors, axis=0)
-        return document_vector  # Возвращаем numpy array
-    else:
+    if not all_sentences:
         return None  # Если нет векторов, возвращаем None
 
+    try:
+        sentence_vectors = encode_sentences(all_sentences)
+    except Exception as e:
+        logger.error(f"Ошибка при векторизации предложений: {e}")
+        return None
+
+    # Вектор главы — среднее векторов её предложений
+    all_chapter_vectors = [sentence_vectors[start:end].mean(axis=0) for start, end in chapter_bounds]
+
+    # Усредняем векторы для всех глав, чтобы получить финальный вектор документа
+    document_vector = np.mean(all_chapter_vectors, axis=0)
+    return document_vector  # Возвращаем numpy array
+
 # # Пример использования
 # txt_filename = 'output.txt'  # Укажите путь к вашему текстовому файлу
 # document_vector = process_text(txt_filename)
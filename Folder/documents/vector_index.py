@@ -0,0 +1,222 @@
+"""
+Индекс векторов общей базы для быстрого поиска похожих документов
+"""
+
+import time
+import threading
+import logging
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Время жизни индекса в процессе (секунды), после которого он перестраивается принудительно
+INDEX_TTL = 300
+# Наибольшее значение hnsw.ef_search, допустимое в pgvector
+PGVECTOR_MAX_EF_SEARCH = 1000
+
+
+class VectorMatrixIndex:
+    """
+    Непрерывная матрица нормализованных векторов float32 с параллельным массивом ID.
+    Поиск кандидатов выполняется одним матрично-векторным произведением.
+    """
+
+    def __init__(self, ids: np.ndarray, matrix: np.ndarray):
+        self.ids = ids
+        self.matrix = matrix
+
+    @classmethod
+    def from_vectors(cls, items: Iterable[Tuple[int, np.ndarray]], dimensions: Optional[int] = None) -> 'VectorMatrixIndex':
+        """
+        Строит индекс из пар (ID документа, вектор).
+        Нулевые векторы и векторы чужой размерности пропускаются.
+        """
+        ids = []
+        rows = []
+        for doc_id, vector in items:
+            if vector is None:
+                continue
+            vector = np.asarray(vector, dtype=np.float32).ravel()
+            if dimensions is None:
+                dimensions = vector.shape[0]
+            if vector.shape[0] != dimensions:
+                continue
+            ids.append(doc_id)
+            rows.append(vector)
+
+        if not rows:
+            return cls(np.empty(0, dtype=np.int64), np.empty((0, dimensions or 0), dtype=np.float32))
+
+        matrix = np.ascontiguousarray(np.vstack(rows), dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1)
+        keep = norms > 0
+        matrix = matrix[keep] / norms[keep, None]
+        return cls(np.asarray(ids, dtype=np.int64)[keep], np.ascontiguousarray(matrix, dtype=np.float32))
+
+    def __len__(self):
+        return int(self.ids.shape[0])
+
+    def search(self, query: np.ndarray, k: int = 10, threshold: float = 0.0,
+               exclude_ids: Optional[Iterable[int]] = None) -> List[Tuple[int, float]]:
+        """
+        Возвращает до k пар (ID документа, косинусное сходство) со сходством выше порога,
+        отсортированных по убыванию сходства.
+        """
+        if len(self) == 0 or query is None:
+            return []
+
+        query = np.asarray(query, dtype=np.float32).ravel()
+        if query.shape[0] != self.matrix.shape[1]:
+            return []
+
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return []
+
+        scores = self.matrix @ (query / norm)
+
+        if exclude_ids:
+            scores[np.isin(self.ids, np.fromiter(exclude_ids, dtype=np.int64))] = -np.inf
+
+        candidates = np.flatnonzero(scores > threshold)
+        if candidates.size == 0:
+            return []
+
+        if k and candidates.size > k:
+            top = np.argpartition(-scores[candidates], k - 1)[:k]
+            candidates = candidates[top]
+
+        candidates = candidates[np.argsort(-scores[candidates], kind='stable')]
+        return [(int(self.ids[i]), float(scores[i])) for i in candidates]
+
+
+# Индекс общей базы (документы на защите), живущий в памяти процесса
+_defense_index = None
+_defense_index_state = None
+_defense_index_built_at = 0.0
+_defense_index_lock = threading.Lock()
+
+
+def _defense_base_state():
+    """Дешёвый «отпечаток» состояния общей базы для проверки актуальности индекса"""
+    from django.db.models import Count, Max
+    from documents.models import Document
+
+    state = Document.objects.filter(on_defense=True)\
+                            .exclude(vector__isnull=True)\
+                            .aggregate(count=Count('id'), max_id=Max('id'), last_sent=Max('sent_to_defense_at'))
+    return state['count'], state['max_id'], state['last_sent']
+
+
+def build_defense_index() -> VectorMatrixIndex:
+    """Строит индекс по всем документам общей базы одним запросом"""
+    from documents.models import Document
+
+    rows = Document.objects.filter(on_defense=True)\
+                           .exclude(vector__isnull=True)\
+                           .values_list('id', 'vector')\
+                           .iterator(chunk_size=2000)
+
+    def decoded():
+        for doc_id, raw in rows:
+            yield doc_id, Document.decode_vector(raw)
+
+    return VectorMatrixIndex.from_vectors(decoded())
+
+
+def get_defense_index() -> VectorMatrixIndex:
+    """
+    Возвращает индекс общей базы, перестраивая его при изменении состава базы
+    или по истечении INDEX_TTL.
+    """
+    global _defense_index, _defense_index_state, _defense_index_built_at
+
+    with _defense_index_lock:
+        state = _defense_base_state()
+        expired = time.monotonic() - _defense_index_built_at > INDEX_TTL
+
+        if _defense_index is None or state != _defense_index_state or expired:
+            start_time = time.monotonic()
+            _defense_index = build_defense_index()
+            _defense_index_state = state
+            _defense_index_built_at = time.monotonic()
+            logger.info(
+                f"Индекс общей базы перестроен: {len(_defense_index)} векторов "
+                f"за {_defense_index_built_at - start_time:.3f} с"
+            )
+
+        return _defense_index
+
+
+def invalidate_defense_index():
+    """Сбрасывает индекс общей базы (будет перестроен при следующем поиске)"""
+    global _defense_index, _defense_index_state
+
+    with _defense_index_lock:
+        _defense_index = None
+        _defense_index_state = None
+
+
+class PgVectorIndex:
+    """
+    Поиск кандидатов в PostgreSQL по HNSW-индексу pgvector:
+    ORDER BY normalized_vector <=> :q LIMIT k без выгрузки векторов в Python.
+
+    Сканирование HNSW-индекса отдаёт не больше hnsw.ef_search ближайших векторов,
+    а условия запроса (общая база, исключения) проверяются уже после него, поэтому
+    ef_search поднимается на время запроса, а при нехватке строк запрос повторяется
+    с большим значением (до PGVECTOR_MAX_EF_SEARCH).
+    """
+
+    def search(self, query: np.ndarray, k: int = 10, threshold: float = 0.0,
+               exclude_ids: Optional[Iterable[int]] = None) -> List[Tuple[int, float]]:
+        from django.conf import settings
+        from django.db import connections, transaction
+        from pgvector.django import CosineDistance
+        from documents.vector_models import DocumentVector
+
+        if query is None:
+            return []
+
+        query = np.asarray(query, dtype=np.float32).ravel()
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return []
+
+        queryset = DocumentVector.objects.filter(document__on_defense=True, normalized_vector__isnull=False)
+        if exclude_ids:
+            queryset = queryset.exclude(document_id__in=list(exclude_ids))
+
+        queryset = queryset.annotate(distance=CosineDistance('normalized_vector', (query / norm).tolist()))\
+                           .order_by('distance')\
+                           .values_list('document_id', 'distance')
+
+        ef_search = min(max(getattr(settings, 'PGVECTOR_EF_SEARCH', 100), k), PGVECTOR_MAX_EF_SEARCH)
+        while True:
+            # SET LOCAL действует до конца транзакции, то есть только на этот запрос
+            with transaction.atomic(using=queryset.db):
+                with connections[queryset.db].cursor() as cursor:
+                    cursor.execute(f'SET LOCAL hnsw.ef_search = {int(ef_search)}')
+                rows = list(queryset[:k])
+            if len(rows) >= k or ef_search >= PGVECTOR_MAX_EF_SEARCH:
+                break
+            ef_search = min(ef_search * 4, PGVECTOR_MAX_EF_SEARCH)
+
+        # Порог применяется после LIMIT: условие на расстояние в запросе тоже проверялось бы
+        # после сканирования индекса и сокращало бы выдачу
+        similarities = [(doc_id, 1.0 - float(distance)) for doc_id, distance in rows]
+        return [(doc_id, similarity) for doc_id, similarity in similarities if similarity > threshold]
+
+
+def get_vector_index():
+    """
+    Возвращает бэкенд поиска кандидатов согласно настройке VECTOR_SEARCH_BACKEND:
+    'memory' — матрица в памяти процесса, 'pgvector' — поиск в базе данных.
+    """
+    from django.conf import settings
+
+    if getattr(settings, 'VECTOR_SEARCH_BACKEND', 'memory') == 'pgvector':
+        return PgVectorIndex()
+    return get_defense_index()
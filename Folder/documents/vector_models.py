@@ -3,6 +3,7 @@
 """
 
 import numpy as np
+from typing import Dict, Iterable, Tuple
 from django.db import models
 from django.contrib.postgres.indexes import GinIndex
 from pgvector.django import VectorField, IvfflatIndex, HnswIndex
@@ -35,8 +36,28 @@ class DocumentVector(models.Model):
         indexes = [
             # Индекс по времени создания
             models.Index(fields=['created_at'], name='vector_created_idx'),
+            # HNSW-индекс для приближённого поиска по косинусному расстоянию
+            HnswIndex(
+                name='vector_normalized_hnsw_idx',
+                fields=['normalized_vector'],
+                m=16,
+                ef_construction=64,
+                opclasses=['vector_cosine_ops'],
+            ),
         ]
     
+    @classmethod
+    def store_for_document(cls, document, vector_array):
+        """Создаёт или обновляет векторное представление документа"""
+        if vector_array is None:
+            cls.objects.filter(document=document).delete()
+            return None
+        
+        doc_vector = cls.objects.filter(document=document).first() or cls(document=document)
+        doc_vector.set_vector(vector_array)
+        doc_vector.save()
+        return doc_vector
+    
     def set_vector(self, vector_array):
         """Устанавливает вектор и вычисляет нормализованную версию"""
         if vector_array is not None:
@@ -91,9 +112,17 @@ class DocumentSimilarity(models.Model):
     
     # Метаданные
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     is_paraphrasing = models.BooleanField(default=False)
     confidence_score = models.FloatField(default=0.0)
     
+    # Полный результат сравнения (document1 — проверяемый документ, document2 — источник)
+    # и условия, при которых он остаётся действительным: содержимое обоих файлов и версия сравнения
+    comparison = models.JSONField(null=True, blank=True)
+    document1_content_hash = models.CharField(max_length=64, null=True, blank=True)
+    document2_content_hash = models.CharField(max_length=64, null=True, blank=True)
+    comparison_version = models.CharField(max_length=64, blank=True, default='')
+    
     class Meta:
         db_table = 'document_similarities'
         unique_together = [['document1', 'document2']]
@@ -105,6 +134,114 @@ class DocumentSimilarity(models.Model):
     
     def __str__(self):
         return f"{self.document1.name} <-> {self.document2.name}: {self.weighted_similarity:.3f}"
+    
+    @classmethod
+    def load_comparisons(cls, document, sources, comparison_version: str) -> Dict[int, Dict]:
+        """
+        Сохранённые результаты сравнения документа с источниками, которые всё ещё действительны:
+        содержимое обоих файлов и версия сравнения не изменились.
+        Возвращает словарь {ID источника: результат сравнения}.
+        """
+        if not document.content_hash:
+            return {}
+        
+        content_hashes = {source.id: source.content_hash for source in sources if source.content_hash}
+        rows = cls.objects.filter(
+            document1=document,
+            document2_id__in=list(content_hashes),
+            document1_content_hash=document.content_hash,
+            comparison_version=comparison_version,
+            comparison__isnull=False
+        ).values_list('document2_id', 'document2_content_hash', 'comparison')
+        
+        return {
+            source_id: comparison
+            for source_id, source_hash, comparison in rows
+            if content_hashes.get(source_id) == source_hash
+        }
+    
+    @classmethod
+    def store_comparisons(cls, document, results: Iterable[Tuple[object, float, Dict]], comparison_version: str):
+        """
+        Сохраняет результаты сравнения документа с источниками одним запросом
+        (INSERT ... ON CONFLICT DO UPDATE по паре документов).
+        
+        Args:
+            results: тройки (источник, косинусное сходство векторов, результат сравнения)
+        """
+        rows = []
+        for source, vector_similarity, comparison in results:
+            detailed = comparison['detailed_similarity']
+            jaccard = float(detailed.get('shingle_3', 0.0))
+            rows.append(cls(
+                document1=document,
+                document2=source,
+                cosine_similarity=float(vector_similarity),
+                jaccard_similarity=jaccard,
+                dice_similarity=2 * jaccard / (1 + jaccard),
+                # Символьная схожесть — ближайшая к Левенштейну метрика, которую считает сравнение
+                levenshtein_similarity=float(detailed.get('char_similarity', 0.0)),
+                weighted_similarity=float(detailed['overall_similarity']),
+                comparison=comparison,
+                document1_content_hash=document.content_hash,
+                document2_content_hash=source.content_hash,
+                comparison_version=comparison_version
+            ))
+        
+        if rows:
+            cls.objects.bulk_create(
+                rows,
+                update_conflicts=True,
+                unique_fields=['document1', 'document2'],
+                update_fields=[
+                    'cosine_similarity', 'jaccard_similarity', 'dice_similarity', 'levenshtein_similarity',
+                    'weighted_similarity', 'comparison', 'document1_content_hash', 'document2_content_hash',
+                    'comparison_version', 'updated_at'
+                ]
+            )
+    
+    @classmethod
+    def invalidate_document(cls, document):
+        """Удаляет сохранённые результаты сравнения документа (например, после повторного извлечения текста)"""
+        cls.objects.filter(models.Q(document1=document) | models.Q(document2=document)).delete()
+
+
+class DocumentShingle(models.Model):
+    """
+    Инвертированный индекс общей базы: отпечаток шингла -> документ
+    """
+    fingerprint = models.BigIntegerField()
+    document = models.ForeignKey(
+        'Document',
+        on_delete=models.CASCADE,
+        related_name='shingle_postings'
+    )
+    
+    class Meta:
+        db_table = 'document_shingles'
+        unique_together = [['fingerprint', 'document']]
+    
+    def __str__(self):
+        return f"{self.fingerprint} -> {self.document_id}"
+
+
+class DocumentMinHashBand(models.Model):
+    """
+    LSH-индекс общей базы: ключ бакета полосы MinHash-сигнатуры -> документ
+    """
+    band_key = models.BigIntegerField()
+    document = models.ForeignKey(
+        'Document',
+        on_delete=models.CASCADE,
+        related_name='minhash_bands'
+    )
+    
+    class Meta:
+        db_table = 'document_minhash_bands'
+        unique_together = [['band_key', 'document']]
+    
+    def __str__(self):
+        return f"{self.band_key} -> {self.document_id}"
 
 
 class DocumentBatch(models.Model):
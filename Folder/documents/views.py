@@ -22,6 +22,8 @@ from django.conf import settings
 
 # Импорт Celery задачи
 from documents.tasks import process_document_plagiarism
+from documents.vector_index import invalidate_defense_index
+from documents import shingle_index
 
 
 def download_file(request, document_id):
@@ -163,6 +165,8 @@ def send_to_defense(request, document_id):
     document.on_defense = True
     document.sent_to_defense_at = timezone.now()
     document.save()
+    invalidate_defense_index()
+    shingle_index.index_document(document)
     
     # Удаляем остальные документы пользователя старше 3 дней (кроме того что на защите)
     three_days_ago = timezone.now() - timedelta(days=3)
@@ -194,6 +198,8 @@ def cancel_from_defense(request, document_id):
     document.on_defense = False
     document.sent_to_defense_at = None
     document.save()
+    invalidate_defense_index()
+    shingle_index.unindex_document(document)
     
     messages.success(request, f'Документ "{document.name}" снят с защиты')
     return redirect('documents:cabinet')
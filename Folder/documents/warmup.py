@@ -0,0 +1,119 @@
+"""
+Прогрев процесса воркера Celery: загрузка модели векторизации и индекса общей базы
+до приёма первой задачи (вызывается из сигнала worker_process_init).
+"""
+
+import os
+import json
+import time
+import socket
+import logging
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# Ключ готовности процесса в Redis: worker:ready:<хост>:<pid>
+READY_KEY_PREFIX = 'worker:ready'
+READY_KEY_TTL = 24 * 3600
+
+# Ожидание сервера векторизации при прогреве: число проверок /health и пауза между ними (секунды)
+EMBEDDING_SERVER_WAIT_ATTEMPTS = 5
+EMBEDDING_SERVER_WAIT_INTERVAL = 3
+
+# Состояние прогрева текущего процесса
+WARMUP_STATUS = {'ready': False}
+
+
+def get_ready_key(pid=None):
+    return f'{READY_KEY_PREFIX}:{socket.gethostname()}:{pid or os.getpid()}'
+
+
+def _warm_up_model():
+    """Загружает модель (или проверяет сервер векторизации) и выполняет пробный прогон"""
+    from documents import vector
+    from documents.embedding_server import check_server_health
+
+    server_url = getattr(settings, 'EMBEDDING_SERVER_URL', '')
+    if server_url:
+        # Сервер может ещё загружать модель; локальная загрузка в каждом процессе пула
+        # заняла бы столько памяти, сколько сервер и должен экономить
+        for attempt in range(EMBEDDING_SERVER_WAIT_ATTEMPTS):
+            if attempt:
+                time.sleep(EMBEDDING_SERVER_WAIT_INTERVAL)
+            health = check_server_health(server_url)
+            if health is not None:
+                return f"сервер {server_url} ({health.get('backend', '?')})"
+        raise RuntimeError(f"сервер векторизации {server_url} недоступен, модель в процесс не загружается")
+
+    model = vector.get_model()
+    model.encode(['Прогрев модели векторизации.'], batch_size=1, convert_to_numpy=True, show_progress_bar=False)
+    return f"{vector.MODEL_NAME} ({vector.get_embedding_backend()})"
+
+
+def _warm_up_vector_index():
+    """Строит индекс векторов общей базы в памяти процесса"""
+    from documents.vector_index import get_defense_index
+
+    if getattr(settings, 'VECTOR_SEARCH_BACKEND', 'memory') == 'pgvector':
+        # Индекс в базе данных, в памяти процесса строить нечего
+        return 'pgvector'
+    return f"{len(get_defense_index())} векторов"
+
+
+def publish_status():
+    """Публикует состояние прогрева процесса в Redis (если доступен)"""
+    from documents.utils_cache import get_redis_client
+
+    client = get_redis_client()
+    if not client:
+        return
+    try:
+        client.set(get_ready_key(), json.dumps(WARMUP_STATUS, ensure_ascii=False), ex=READY_KEY_TTL)
+    except Exception as e:
+        logger.warning(f"Не удалось опубликовать готовность воркера: {e}")
+
+
+def clear_status():
+    from documents.utils_cache import get_redis_client
+
+    client = get_redis_client()
+    if not client:
+        return
+    try:
+        client.delete(get_ready_key())
+    except Exception:
+        pass
+
+
+def warm_up():
+    """
+    Прогревает процесс: модель и индекс загружаются по очереди, ошибка одного шага
+    не мешает остальным (задачи в этом случае загрузят недостающее сами).
+    """
+    start_time = time.monotonic()
+    WARMUP_STATUS.update({'ready': False, 'pid': os.getpid(), 'errors': []})
+
+    for name, step in (('model', _warm_up_model), ('vector_index', _warm_up_vector_index)):
+        step_start = time.monotonic()
+        try:
+            WARMUP_STATUS[name] = step()
+        except Exception as e:
+            WARMUP_STATUS['errors'].append(f'{name}: {e}')
+            logger.error(f"Ошибка прогрева ({name}): {e}")
+        WARMUP_STATUS[f'{name}_seconds'] = round(time.monotonic() - step_start, 3)
+
+    # Соединение с базой, открытое при прогреве, не должно переживать процесс-родитель пула
+    connections.close_all()
+
+    WARMUP_STATUS['ready'] = True
+    WARMUP_STATUS['seconds'] = round(time.monotonic() - start_time, 3)
+    publish_status()
+
+    logger.info(
+        f"Воркер {os.getpid()} готов за {WARMUP_STATUS['seconds']} с: "
+        f"модель — {WARMUP_STATUS.get('model', 'не загружена')}, "
+        f"индекс общей базы — {WARMUP_STATUS.get('vector_index', 'не построен')}"
+    )
+    return WARMUP_STATUS